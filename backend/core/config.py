@@ -50,6 +50,78 @@ class Settings:
         pass
 
     SUITES_FOLDER = 'suites'
+
+    # SYNC SETTINGS
+    # number of Script rows sent per executemany batch while indexing a repo
+    SYNC_BATCH_SIZE = int(os.getenv('SYNC_BATCH_SIZE', '500'))
+    # parallel docstring parsing: worker processes (1 = serial) and files per task chunk
+    SCAN_WORKERS = int(os.getenv('SCAN_WORKERS', str(os.cpu_count() or 1)))
+    SCAN_CHUNK_SIZE = int(os.getenv('SCAN_CHUNK_SIZE', '16'))
+    # background sync jobs: concurrent syncs and how many finished jobs to keep for status queries
+    SYNC_JOB_WORKERS = int(os.getenv('SYNC_JOB_WORKERS', '2'))
+    SYNC_JOB_HISTORY = int(os.getenv('SYNC_JOB_HISTORY', '200'))
+
+    # PARSE CACHE SETTINGS
+    # persistent cache of parser results keyed by git blob SHA (SQLite file)
+    PARSE_CACHE_ENABLED = (os.getenv('PARSE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes'))
+    PARSE_CACHE_PATH = _clean_env(os.getenv('PARSE_CACHE_PATH')) or str(pathlib.Path(BASE_DIR).parent.joinpath('cache', 'parse_cache.sqlite3'))
+    PARSE_CACHE_MAX_BYTES = int(os.getenv('PARSE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+    # GIT OBJECT READS
+    # persistent `git cat-file` processes per repo (of each kind) and per-request timeout in seconds
+    CATFILE_POOL_SIZE = int(os.getenv('CATFILE_POOL_SIZE', '4'))
+    CATFILE_TIMEOUT = float(os.getenv('CATFILE_TIMEOUT', '10'))
+
+    # SEARCH INDEX (SQLite FTS5 file derived from the scripts table)
+    SEARCH_INDEX_ENABLED = (os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes'))
+    SEARCH_INDEX_PATH = _clean_env(os.getenv('SEARCH_INDEX_PATH')) or str(pathlib.Path(BASE_DIR).parent.joinpath('cache', 'search_index.sqlite3'))
+    # also index file content (first SEARCH_INDEX_CONTENT_MAX_BYTES bytes of each script)
+    SEARCH_INDEX_CONTENT = (os.getenv('SEARCH_INDEX_CONTENT', 'false').lower() in ('1', 'true', 'yes'))
+    SEARCH_INDEX_CONTENT_MAX_BYTES = int(os.getenv('SEARCH_INDEX_CONTENT_MAX_BYTES', str(256 * 1024)))
+
+    # /scripts page size: default and maximum `limit`
+    SCRIPTS_PAGE_SIZE = int(os.getenv('SCRIPTS_PAGE_SIZE', '500'))
+    SCRIPTS_MAX_PAGE_SIZE = int(os.getenv('SCRIPTS_MAX_PAGE_SIZE', '5000'))
+
+    # import graph: extra repo-relative import roots besides the repo root and the script's
+    # own directory (comma-separated, e.g. 'lib,libs/common')
+    DEPENDENCY_ROOTS = [p.strip().strip('/') for p in os.getenv('DEPENDENCY_ROOTS', '').split(',') if p.strip().strip('/')]
+
+    # /fs/batch limits: paths per request and total content bytes per response
+    BATCH_MAX_PATHS = int(os.getenv('BATCH_MAX_PATHS', '1000'))
+    BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_BYTES', str(32 * 1024 * 1024)))
+
+    # dedicated pools for blocking endpoints: worker threads and calls allowed to wait (then 503)
+    FS_WORKERS = int(os.getenv('FS_WORKERS', '16'))
+    FS_QUEUE_LIMIT = int(os.getenv('FS_QUEUE_LIMIT', '256'))
+    GIT_WORKERS = int(os.getenv('GIT_WORKERS', '4'))
+    GIT_QUEUE_LIMIT = int(os.getenv('GIT_QUEUE_LIMIT', '32'))
+
+    # FS METADATA CACHE
+    # in-process LRU of /fs/meta results keyed by file stat; approximate memory limit in bytes
+    META_CACHE_MAX_BYTES = int(os.getenv('META_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+    # /fs/tree SNAPSHOTS
+    # generations of deltas kept per repo, and seconds a tree walk is reused between requests
+    TREE_HISTORY = int(os.getenv('TREE_HISTORY', '64'))
+    TREE_SNAPSHOT_TTL = float(os.getenv('TREE_SNAPSHOT_TTL', '1.0'))
+
+    # LIVE INDEX (inotify watcher, Linux only, disabled by default)
+    WATCH_REPOS = (os.getenv('WATCH_REPOS', 'false').lower() in ('1', 'true', 'yes'))
+    # seconds of quiet before a repo's coalesced changes are indexed, and the maximum wait during a burst
+    WATCH_DEBOUNCE = float(os.getenv('WATCH_DEBOUNCE', '1.0'))
+    WATCH_MAX_DELAY = float(os.getenv('WATCH_MAX_DELAY', '10'))
+    # above this many changed paths a repo is rescanned as a whole
+    WATCH_FULL_RESCAN_THRESHOLD = int(os.getenv('WATCH_FULL_RESCAN_THRESHOLD', '5000'))
+
+    # SCHEDULED FLEET FETCH (0 disables the scheduler)
+    FETCH_INTERVAL = int(os.getenv('FETCH_INTERVAL', '0'))
+    # repos checked in parallel, ls-remote timeout and max wait for a triggered sync (seconds)
+    FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', '4'))
+    FETCH_TIMEOUT = int(os.getenv('FETCH_TIMEOUT', '30'))
+    FETCH_SYNC_TIMEOUT = int(os.getenv('FETCH_SYNC_TIMEOUT', '1800'))
+    # repos synced more recently than this (seconds) are not checked again
+    FETCH_MIN_AGE = int(os.getenv('FETCH_MIN_AGE', '60'))
     # Optional: default repository used by the Script Browser when only one repo is intended
     SCRIPT_REPO_NAME = _clean_env(os.getenv('SCRIPT_REPO_NAME')) or None
     
@@ -1,8 +1,10 @@
 """Backfill script metadata (description, topology, author) by reparsing repo files.
 Usage:
-  python backend/db/backfill_script_fields.py
+  python backend/db/backfill_script_fields.py [--workers N] [--chunk-size N]
 This will iterate repos and scripts recorded in DB and re-run parse_docstrings on each file, updating DB columns.
+Files are parsed in parallel with the same engine used by repo sync (see SCAN_WORKERS / SCAN_CHUNK_SIZE).
 """
+import argparse
 import sys
 from pathlib import Path
 
@@ -13,27 +15,35 @@ sys.path.insert(0, str(repo_root))
 from backend.db.session import SessionLocal
 from backend.db.models import Repo, Script
 from backend.gitmanager.service import parse_docstrings
+from backend.gitmanager.scanner import scan_files
 
-def backfill():
+def backfill(workers=None, chunksize=None):
     db = SessionLocal()
     try:
         repos = db.query(Repo).all()
         for r in repos:
             print(f"Processing repo: {r.name}")
             scripts = db.query(Script).filter(Script.repo_id == r.id).all()
+            by_path = {}
             for s in scripts:
                 p = Path(s.path)
                 if not p.exists():
                     print(f"  File missing: {s.path}")
                     continue
-                parsed = parse_docstrings(p)
+                by_path[p] = s
+            for p, parsed in scan_files(list(by_path), parse_docstrings, workers=workers, chunksize=chunksize):
+                s = by_path[p]
                 s.description = parsed.get('description')
                 s.topology = parsed.get('topology')
                 s.author = parsed.get('author')
-                db.commit()
                 print(f"  Updated {s.filename}: desc={'Y' if s.description else 'N'}, topology={s.topology}, author={s.author}")
+            db.commit()
     finally:
         db.close()
 
 if __name__ == '__main__':
-    backfill()
+    parser = argparse.ArgumentParser(description='Backfill script metadata columns from parsed docstrings')
+    parser.add_argument('--workers', type=int, default=None, help='parser processes (default: SCAN_WORKERS)')
+    parser.add_argument('--chunk-size', type=int, default=None, help='files per worker task (default: SCAN_CHUNK_SIZE)')
+    args = parser.parse_args()
+    backfill(workers=args.workers, chunksize=args.chunk_size)
@@ -0,0 +1,41 @@
+"""Run this script to add the clone option columns to the `repos` table if they don't exist.
+Usage:
+  python backend/db/migrate_add_repo_clone_options.py
+It uses SQLAlchemy engine configured in `backend/db/session.py`.
+"""
+from sqlalchemy import inspect, text
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import engine
+
+def ensure_columns():
+    inspector = inspect(engine)
+    if 'repos' not in inspector.get_table_names():
+        print("Table 'repos' does not exist. Create tables first (create_tables.py).")
+        return
+    cols = [c['name'] for c in inspector.get_columns('repos')]
+    stmts = []
+    if 'clone_depth' not in cols:
+        stmts.append("ALTER TABLE repos ADD COLUMN clone_depth INTEGER")
+    if 'clone_filter' not in cols:
+        stmts.append("ALTER TABLE repos ADD COLUMN clone_filter VARCHAR(50)")
+    if 'sparse_paths' not in cols:
+        stmts.append("ALTER TABLE repos ADD COLUMN sparse_paths TEXT")
+
+    if not stmts:
+        print('No changes needed. Columns already present.')
+        return
+
+    with engine.begin() as conn:
+        for s in stmts:
+            print('Executing:', s)
+            conn.execute(text(s))
+    print('Migration complete.')
+
+if __name__ == '__main__':
+    ensure_columns()
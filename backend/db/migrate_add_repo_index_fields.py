@@ -0,0 +1,37 @@
+"""Run this script to add the incremental-indexing column to the `repos` table if missing.
+Usage:
+  python backend/db/migrate_add_repo_index_fields.py
+It uses SQLAlchemy engine configured in `backend/db/session.py`.
+"""
+from sqlalchemy import inspect, text
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import engine
+
+def ensure_columns():
+    inspector = inspect(engine)
+    if 'repos' not in inspector.get_table_names():
+        print("Table 'repos' does not exist. Create tables first (create_tables.py).")
+        return
+    cols = [c['name'] for c in inspector.get_columns('repos')]
+    stmts = []
+    if 'last_indexed_commit' not in cols:
+        stmts.append("ALTER TABLE repos ADD COLUMN last_indexed_commit VARCHAR(40)")
+
+    if not stmts:
+        print('No changes needed. Columns already present.')
+        return
+
+    with engine.begin() as conn:
+        for s in stmts:
+            print('Executing:', s)
+            conn.execute(text(s))
+    print('Migration complete.')
+
+if __name__ == '__main__':
+    ensure_columns()
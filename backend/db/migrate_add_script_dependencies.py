@@ -0,0 +1,54 @@
+"""Run this script to add the import dependency graph: `scripts.imports_doc` and `script_dependencies`.
+Usage:
+  python backend/db/migrate_add_script_dependencies.py
+Each registered repo whose checkout exists is then re-indexed in full (no git operations),
+which records every script's imports and resolves them against the repo layout, and fills
+`script_functions` (run migrate_add_script_functions.py first).
+It uses SQLAlchemy engine configured in `backend/db/session.py`.
+"""
+from sqlalchemy import inspect, text
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import engine, SessionLocal
+from backend.db.models import Repo, ScriptDependency, ScriptFunction
+from backend.gitmanager.service import reindex_paths
+
+
+def ensure_schema():
+    inspector = inspect(engine)
+    if 'scripts' not in inspector.get_table_names():
+        print("Table 'scripts' does not exist. Create tables first (create_tables.py).")
+        return
+    cols = [c['name'] for c in inspector.get_columns('scripts')]
+    if 'imports_doc' not in cols:
+        stmt = "ALTER TABLE scripts ADD COLUMN imports_doc TEXT"
+        print('Executing:', stmt)
+        with engine.begin() as conn:
+            conn.execute(text(stmt))
+    if 'script_dependencies' not in inspector.get_table_names():
+        print('Creating table script_dependencies')
+        ScriptDependency.__table__.create(engine)
+    if 'script_functions' not in inspector.get_table_names():
+        print('Creating table script_functions')
+        ScriptFunction.__table__.create(engine)
+
+    db = SessionLocal()
+    try:
+        for repo in db.query(Repo).all():
+            if not Path(repo.local_path).is_dir():
+                print(f"Skipping repo {repo.name}: {repo.local_path} not found")
+                continue
+            counts = reindex_paths(db, repo, [], full=True)
+            print(f"Indexed repo {repo.name}: {counts}")
+    finally:
+        db.close()
+    print('Migration complete.')
+
+
+if __name__ == '__main__':
+    ensure_schema()
@@ -0,0 +1,34 @@
+"""Run this script to create the `script_functions` table.
+Usage:
+  python backend/db/migrate_add_script_functions.py
+The table is filled by the full re-index that migrate_add_script_dependencies.py runs next
+(the indexer also needs the `scripts.imports_doc` column that script adds).
+It uses SQLAlchemy engine configured in `backend/db/session.py`.
+"""
+from sqlalchemy import inspect
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import engine
+from backend.db.models import ScriptFunction
+
+
+def ensure_table():
+    inspector = inspect(engine)
+    if 'scripts' not in inspector.get_table_names():
+        print("Table 'scripts' does not exist. Create tables first (create_tables.py).")
+        return
+    if 'script_functions' not in inspector.get_table_names():
+        print('Creating table script_functions')
+        ScriptFunction.__table__.create(engine)
+    else:
+        print('Table script_functions already present.')
+    print('Migration complete. Run backend/db/migrate_add_script_dependencies.py to fill it.')
+
+
+if __name__ == '__main__':
+    ensure_table()
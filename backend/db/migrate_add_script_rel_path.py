@@ -0,0 +1,57 @@
+"""Run this script to add the indexed `rel_path` column to the `scripts` table and fill it in.
+Usage:
+  python backend/db/migrate_add_script_rel_path.py
+`rel_path` is the script's path relative to its repo root ('/' separators); it backs the
+keyset pagination and `dir` filter of GET /git/scripts. Existing rows are backfilled
+from their paths (no files are read).
+It uses SQLAlchemy engine configured in `backend/db/session.py`.
+"""
+from sqlalchemy import inspect, text
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import engine
+from backend.gitmanager.service import script_rel_path
+
+BATCH_SIZE = 1000
+
+
+def ensure_columns():
+    inspector = inspect(engine)
+    if 'scripts' not in inspector.get_table_names():
+        print("Table 'scripts' does not exist. Create tables first (create_tables.py).")
+        return
+    cols = [c['name'] for c in inspector.get_columns('scripts')]
+    indexes = [i['name'] for i in inspector.get_indexes('scripts')]
+    stmts = []
+    if 'rel_path' not in cols:
+        stmts.append("ALTER TABLE scripts ADD COLUMN rel_path VARCHAR(500)")
+    if 'ix_scripts_repo_rel_path' not in indexes:
+        stmts.append("CREATE INDEX ix_scripts_repo_rel_path ON scripts (repo_id, rel_path)")
+
+    with engine.begin() as conn:
+        for s in stmts:
+            print('Executing:', s)
+            conn.execute(text(s))
+    if not stmts:
+        print('No schema changes needed. Column and index already present.')
+    backfill()
+
+
+def backfill():
+    with engine.begin() as conn:
+        repos = dict(conn.execute(text("SELECT id, local_path FROM repos")).fetchall())
+        rows = conn.execute(text("SELECT id, repo_id, path FROM scripts WHERE rel_path IS NULL")).fetchall()
+        params = [{"id": sid, "rel_path": script_rel_path(path, repos[repo_id])}
+                  for sid, repo_id, path in rows if repo_id in repos]
+        for i in range(0, len(params), BATCH_SIZE):
+            conn.execute(text("UPDATE scripts SET rel_path = :rel_path WHERE id = :id"), params[i:i + BATCH_SIZE])
+    print(f'Backfilled rel_path on {len(params)} rows.')
+
+
+if __name__ == '__main__':
+    ensure_columns()
@@ -0,0 +1,96 @@
+"""Run this script to make `scripts` rows unique per (repo_id, rel_path) and add the sync indexes.
+Usage:
+  python backend/db/migrate_add_script_unique_index.py
+Needs the `rel_path` column (run migrate_add_script_rel_path.py first). On MySQL `rel_path`
+and `rel_dir` are first switched to the binary utf8mb4_bin collation. Duplicate rows for
+the same file (e.g. left by concurrent syncs) are removed, keeping the newest (highest id),
+before the unique index is created; rebuild the search index afterwards if any were removed.
+It uses SQLAlchemy engine configured in `backend/db/session.py`.
+"""
+from sqlalchemy import inspect, text
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import engine
+from backend.db.migrate_add_script_rel_path import backfill
+
+BATCH_SIZE = 1000
+
+
+def _drop_index(name):
+    if engine.dialect.name == 'mysql':
+        return f"DROP INDEX {name} ON scripts"
+    return f"DROP INDEX {name}"
+
+
+def binary_collation_stmts(inspector) -> list:
+    """On MySQL, MODIFY rel_path/rel_dir to utf8mb4_bin so case or accent variants stay distinct keys."""
+    if engine.dialect.name not in ('mysql', 'mariadb'):
+        return []
+    stmts = []
+    for col in inspector.get_columns('scripts'):
+        if col['name'] in ('rel_path', 'rel_dir') and getattr(col['type'], 'collation', None) != 'utf8mb4_bin':
+            stmts.append(f"ALTER TABLE scripts MODIFY {col['name']} VARCHAR(500) "
+                         "CHARACTER SET utf8mb4 COLLATE utf8mb4_bin")
+    return stmts
+
+
+def remove_duplicates(conn) -> int:
+    dupes = conn.execute(text(
+        "SELECT repo_id, rel_path, MAX(id) FROM scripts WHERE rel_path IS NOT NULL "
+        "GROUP BY repo_id, rel_path HAVING COUNT(*) > 1")).fetchall()
+    removed = 0
+    for repo_id, rel_path, keep_id in dupes:
+        result = conn.execute(text(
+            "DELETE FROM scripts WHERE repo_id = :repo_id AND rel_path = :rel_path AND id <> :keep_id"),
+            {"repo_id": repo_id, "rel_path": rel_path, "keep_id": keep_id})
+        removed += result.rowcount
+    return removed
+
+
+def ensure_indexes():
+    inspector = inspect(engine)
+    if 'scripts' not in inspector.get_table_names():
+        print("Table 'scripts' does not exist. Create tables first (create_tables.py).")
+        return
+    cols = [c['name'] for c in inspector.get_columns('scripts')]
+    if 'rel_path' not in cols:
+        print("Column 'rel_path' is missing. Run backend/db/migrate_add_script_rel_path.py first.")
+        return
+    backfill()
+
+    indexes = [i['name'] for i in inspector.get_indexes('scripts')]
+    # before the duplicate sweep: under a case/accent-insensitive collation distinct files would look duplicated
+    collation_stmts = binary_collation_stmts(inspector)
+    stmts = []
+    if 'ix_scripts_repo_rel_path' in indexes:
+        # superseded by the unique index on the same columns
+        stmts.append(_drop_index('ix_scripts_repo_rel_path'))
+    if 'uq_scripts_repo_rel_path' not in indexes:
+        stmts.append("CREATE UNIQUE INDEX uq_scripts_repo_rel_path ON scripts (repo_id, rel_path)")
+    if 'ix_scripts_repo_path' not in indexes:
+        stmts.append("CREATE INDEX ix_scripts_repo_path ON scripts (repo_id, path)")
+
+    if not stmts and not collation_stmts:
+        print('No changes needed. Indexes already present.')
+        return
+
+    with engine.begin() as conn:
+        for s in collation_stmts:
+            print('Executing:', s)
+            conn.execute(text(s))
+        removed = remove_duplicates(conn)
+        if removed:
+            print(f'Removed {removed} duplicate script rows; run backend/db/rebuild_search_index.py afterwards.')
+        for s in stmts:
+            print('Executing:', s)
+            conn.execute(text(s))
+    print('Migration complete.')
+
+
+if __name__ == '__main__':
+    ensure_indexes()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from backend.db.base import Base
 
@@ -20,14 +20,30 @@ class Repo(Base):
     branch = Column(String(100), default="main")
     local_path = Column(String(500), nullable=False)
     last_sync = Column(DateTime(timezone=True))
+    # commit SHA the scripts index was last built from (drives incremental re-indexing)
+    last_indexed_commit = Column(String(40))
+    # clone options applied on clone and on later fetches:
+    # history depth (NULL = full), partial clone filter (e.g. 'blob:none'),
+    # and a JSON list of sparse-checkout directories (NULL = full checkout)
+    clone_depth = Column(Integer)
+    clone_filter = Column(String(50))
+    sparse_paths = Column(Text)
 
     scripts = relationship("Script", back_populates="repo")
 
+# repo-relative paths compare byte-wise: MySQL's default utf8mb4 collation would treat
+# 'Foo.py' / 'foo.py' or 'café.py' / 'cafe.py' as the same key
+_RelPath = String(500).with_variant(String(500, collation="utf8mb4_bin"), "mysql", "mariadb")
+
+
 class Script(Base):
     __tablename__ = "scripts"
     id = Column(Integer, primary_key=True, index=True)
     repo_id = Column(Integer, ForeignKey("repos.id"))
     path = Column(String(500), nullable=False)
+    # path and directory of the script relative to the repo root ('.' for the root), kept by the indexer
+    rel_path = Column(_RelPath, nullable=False)
+    rel_dir = Column(_RelPath)
     filename = Column(String(255), nullable=False)
     module_doc = Column(Text)
     description = Column(Text)
@@ -35,9 +51,58 @@ class Script(Base):
     author = Column(String(255))
     functions_doc = Column(Text)  # JSON serializzato con i docstring funzioni
     # functions_doc: serialized JSON containing function docstrings
+    imports_doc = Column(Text)  # JSON: import statements as written (module, names, level, lineno)
     last_commit = Column(String(40))
 
     repo = relationship("Repo", back_populates="scripts")
 
+    __table_args__ = (
+        # one row per file: sync upserts rely on it
+        Index("uq_scripts_repo_rel_path", "repo_id", "rel_path", unique=True),
+        # sync preload and path-prefix deletes by absolute path
+        Index("ix_scripts_repo_path", "repo_id", "path"),
+        Index("ix_scripts_repo_rel_dir", "repo_id", "rel_dir"),
+    )
+
+
+# one row per top-level function of a script, kept in sync with Script.functions_doc by the indexer
+class ScriptFunction(Base):
+    __tablename__ = "script_functions"
+    id = Column(Integer, primary_key=True, index=True)
+    script_id = Column(Integer, ForeignKey("scripts.id"), index=True, nullable=False)
+    repo_id = Column(Integer, ForeignKey("repos.id"), index=True)
+    name = Column(String(255), index=True, nullable=False)
+    lineno = Column(Integer)
+    signature = Column(Text)  # e.g. "run(node, retries=3) -> bool"
+    docstring = Column(Text)
+
+
+# import edge: script `script_id` imports the repo file `target_path` (repo-relative), resolved by the indexer
+class ScriptDependency(Base):
+    __tablename__ = "script_dependencies"
+    id = Column(Integer, primary_key=True, index=True)
+    script_id = Column(Integer, ForeignKey("scripts.id"), index=True, nullable=False)
+    repo_id = Column(Integer, ForeignKey("repos.id"), nullable=False)
+    target_path = Column(String(500), nullable=False)
+
+    __table_args__ = (
+        # reverse lookups: which scripts import this file
+        Index("ix_script_dependencies_repo_target", "repo_id", "target_path"),
+    )
+
+
+# outcome and timing of one repo check in a scheduled fleet fetch run
+class SyncRun(Base):
+    __tablename__ = "repo_sync_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String(32), index=True, nullable=False)
+    repo_id = Column(Integer, ForeignKey("repos.id"), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    check_ms = Column(Integer)  # ls-remote round trip
+    sync_ms = Column(Integer)  # fetch + re-index, when the repo changed
+    outcome = Column(String(20), nullable=False)  # unchanged | synced | skipped | error
+    remote_commit = Column(String(40))
+    detail = Column(Text)
+
 
 from . import t_models  # generated T_* models are kept in t_models.py
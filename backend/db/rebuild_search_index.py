@@ -0,0 +1,23 @@
+"""Rebuild the full-text search index (SEARCH_INDEX_PATH) from the scripts table.
+Usage:
+  python backend/db/rebuild_search_index.py
+Sync keeps the index up to date incrementally; run this after restoring the database,
+changing SEARCH_INDEX_CONTENT, or if the index file was lost.
+"""
+import sys
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.db.session import SessionLocal
+from backend.gitmanager import searchindex
+
+if __name__ == '__main__':
+    db = SessionLocal()
+    try:
+        searchindex.rebuild(db)
+        print("Search index rebuilt.")
+    finally:
+        db.close()
@@ -0,0 +1,95 @@
+"""Micro-benchmark: reading blobs at a ref via the cat-file pool vs one git call per read.
+Usage:
+  python backend/gitmanager/bench_catfile.py [--repo PATH] [--ref REF] [--files N] [--iterations N] [--threads N]
+Without --repo a temporary repository with --files small .py files is generated.
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from git import Repo as GitRepo
+from backend.gitmanager import catfile, gitread
+
+
+def make_repo(path: Path, n_files: int):
+    subprocess.run(['git', 'init', '-q', str(path)], check=True)
+    for i in range(n_files):
+        d = path / f"dir{i % 20}"
+        d.mkdir(exist_ok=True)
+        (d / f"test_{i}.py").write_text(f'"""Test {i}\n\n:field Description: synthetic test {i}\n"""\n\ndef run():\n    pass\n' * 5)
+    subprocess.run(['git', '-C', str(path), 'add', '-A'], check=True)
+    subprocess.run(['git', '-C', str(path), '-c', 'user.name=bench', '-c', 'user.email=bench@example.com',
+                    'commit', '-q', '-m', 'bench'], check=True)
+
+
+def list_blobs(repo_dir: Path, ref: str):
+    out = subprocess.run(['git', '-C', str(repo_dir), 'ls-tree', '-r', '--name-only', ref],
+                         check=True, capture_output=True, text=True).stdout
+    return [p for p in out.splitlines() if p]
+
+
+def read_gitpython(repo_dir: Path, ref: str, path: str) -> bytes:
+    repo = GitRepo(str(repo_dir))
+    try:
+        return (repo.commit(ref).tree / path).data_stream.read()
+    finally:
+        repo.close()
+
+
+def read_git_show(repo_dir: Path, ref: str, path: str) -> bytes:
+    return subprocess.run(['git', '-C', str(repo_dir), 'cat-file', 'blob', f"{ref}:{path}"],
+                          check=True, capture_output=True).stdout
+
+
+def read_pool(repo_dir: Path, ref: str, path: str) -> bytes:
+    return gitread.read_file(repo_dir, ref, path)[1]
+
+
+def bench(name, fn, repo_dir, ref, paths, threads):
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as ex:
+            list(ex.map(lambda p: fn(repo_dir, ref, p), paths))
+    else:
+        for p in paths:
+            fn(repo_dir, ref, p)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {len(paths):>6} reads  {elapsed:8.3f}s  {elapsed / len(paths) * 1e6:9.1f} us/read")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repo', help='existing git repository (default: generate one)')
+    parser.add_argument('--ref', default='HEAD')
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo_dir = Path(args.repo) if args.repo else Path(tmp) / 'repo'
+        if not args.repo:
+            make_repo(repo_dir, args.files)
+        files = list_blobs(repo_dir, args.ref)
+        paths = [files[i % len(files)] for i in range(args.iterations)]
+
+        # sanity check: all approaches return the same bytes
+        assert read_pool(repo_dir, args.ref, paths[0]) == read_git_show(repo_dir, args.ref, paths[0])
+
+        print(f"repo={repo_dir} ref={args.ref} files={len(files)} threads={args.threads}")
+        bench('git cat-file per call', read_git_show, repo_dir, args.ref, paths, args.threads)
+        bench('GitPython Repo per call', read_gitpython, repo_dir, args.ref, paths, args.threads)
+        bench('cat-file --batch pool', read_pool, repo_dir, args.ref, paths, args.threads)
+        catfile.close_all()
+
+
+if __name__ == '__main__':
+    main()
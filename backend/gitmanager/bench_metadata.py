@@ -0,0 +1,88 @@
+"""Benchmark: header-only metadata extraction vs reading whole files, on a synthetic directory.
+Usage:
+  python backend/gitmanager/bench_metadata.py [--dir PATH] [--files N] [--large-every N] [--large-kb N]
+Without --dir a temporary directory with --files files is generated: mostly small .py
+scripts with a docstring, plus one large log file every --large-every files.
+The run also checks that /fs/meta, /fs/meta-dir and the sync parser agree on every file.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from backend.gitmanager import metadata
+from backend.gitmanager.service import parse_source
+
+
+def make_dir(path: Path, n_files: int, large_every: int, large_kb: int):
+    path.mkdir(parents=True, exist_ok=True)
+    log_line = "2024-01-01 00:00:00 INFO step passed on node-42\n"
+    large = log_line * (large_kb * 1024 // len(log_line))
+    for i in range(n_files):
+        if large_every and i % large_every == 0:
+            (path / f"run_{i}.log").write_text(large)
+        elif i % 3 == 0:
+            (path / f"test_{i}.py").write_text(
+                f'#!/usr/bin/env python\n"""Test {i}\n\n:field Description: synthetic test {i}\n'
+                f':field Topology: topo{i % 7}\n:field Author: bench\n"""\n\n' + 'def run():\n    pass\n' * 50)
+        elif i % 3 == 1:
+            (path / f"test_{i}.py").write_text(
+                f'# Test {i}\n# Author: bench\n\nimport os\n\n' + 'def run():\n    pass\n' * 50)
+        else:
+            (path / f"data_{i}.txt").write_text(f"Description: plain file {i}\n" + "x" * 2000)
+
+
+def full_read(file_path: Path) -> dict:
+    # previous approach: read the whole file, then look only at its first 4096 characters
+    return metadata.extract_meta(file_path.read_text(encoding='utf-8')[:metadata.HEADER_BYTES])
+
+
+def bench(name, fn, files):
+    start = time.perf_counter()
+    for f in files:
+        try:
+            fn(f)
+        except Exception:
+            pass
+    elapsed = time.perf_counter() - start
+    print(f"{name:<22} {len(files):>6} files  {elapsed:8.3f}s  {elapsed / len(files) * 1e6:9.1f} us/file")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dir', help='existing directory (default: generate one)')
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--large-every', type=int, default=50)
+    parser.add_argument('--large-kb', type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(args.dir) if args.dir else Path(tmp) / 'scripts'
+        if not args.dir:
+            make_dir(target, args.files, args.large_every, args.large_kb)
+        files = sorted(p for p in target.iterdir() if p.is_file())
+
+        mismatches = 0
+        for f in files:
+            try:
+                meta = metadata.file_meta(f)
+            except UnicodeDecodeError:
+                continue
+            fields = {k: meta[k] for k in ('description', 'topology', 'author')}
+            data = f.read_bytes()
+            parsed = parse_source(data.decode('utf-8', 'replace'), metadata.header_text(data))
+            if metadata.blob_meta(data) != meta or {k: parsed[k] for k in fields} != fields:
+                mismatches += 1
+        print(f"dir={target} files={len(files)} mismatches={mismatches}")
+
+        bench('full read', full_read, files)
+        bench('header only', metadata.file_meta, files)
+
+
+if __name__ == '__main__':
+    main()
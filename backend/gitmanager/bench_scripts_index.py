@@ -0,0 +1,116 @@
+"""Benchmark: scripts-table queries used by sync and listing, without and with the composite indexes.
+Usage:
+  python backend/gitmanager/bench_scripts_index.py [--rows N] [--repos N] [--queries N]
+A temporary SQLite database with --rows synthetic scripts spread over --repos repos is
+created without secondary indexes; each query is timed, then the indexes declared on the
+Script model are created and the same queries are timed again.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.schema import CreateTable
+
+from backend.db.models import Script
+
+DOC = "Verify the behaviour of the node under test after a restart. " * 8
+
+
+def populate(conn, rows: int, repos: int):
+    per_repo = rows // repos
+    params = []
+    for repo_id in range(1, repos + 1):
+        for i in range(per_repo):
+            rel_dir = f"area{i % 100}/suite{i % 7}"
+            rel_path = f"{rel_dir}/test_{i}.py"
+            params.append({
+                "repo_id": repo_id, "path": f"/repos/repo{repo_id}/{rel_path}", "rel_path": rel_path,
+                "rel_dir": rel_dir, "filename": f"test_{i}.py", "module_doc": DOC, "description": DOC[:60],
+                "functions_doc": '[{"name": "run", "doc": "%s"}]' % DOC,
+            })
+            if len(params) >= 5000:
+                conn.execute(text(
+                    "INSERT INTO scripts (repo_id, path, rel_path, rel_dir, filename, module_doc, description, functions_doc) "
+                    "VALUES (:repo_id, :path, :rel_path, :rel_dir, :filename, :module_doc, :description, :functions_doc)"),
+                    params)
+                params = []
+    return per_repo
+
+
+def queries(repos: int, per_repo: int):
+    rnd = random.Random(3)
+
+    def repo():
+        return rnd.randint(1, repos)
+
+    def rel():
+        i = rnd.randrange(per_repo)
+        return f"area{i % 100}/suite{i % 7}/test_{i}.py"
+
+    return {
+        "sync lookup (repo_id, rel_path)": lambda: (
+            "SELECT id FROM scripts WHERE repo_id = :r AND rel_path = :p", {"r": repo(), "p": rel()}),
+        "sync lookup (repo_id, path)": lambda: (
+            "SELECT id FROM scripts WHERE repo_id = :r AND path = :p", {"r": (r := repo()), "p": f"/repos/repo{r}/{rel()}"}),
+        "sync preload (repo_id)": lambda: (
+            "SELECT id, path, rel_path FROM scripts WHERE repo_id = :r", {"r": repo()}),
+        "list page (dir prefix)": lambda: (
+            "SELECT id, rel_path, filename, description FROM scripts WHERE repo_id = :r "
+            "AND rel_path >= :lo AND rel_path < :hi ORDER BY repo_id, rel_path LIMIT 500",
+            {"r": repo(), "lo": (d := f"area{rnd.randrange(100)}") + "/", "hi": d + "0"}),
+        "list dirs (DISTINCT rel_dir)": lambda: (
+            "SELECT DISTINCT rel_dir FROM scripts WHERE repo_id = :r", {"r": repo()}),
+    }
+
+
+def run(conn, cases, n: int):
+    for name, make in cases.items():
+        times = []
+        for _ in range(n):
+            sql, params = make()
+            t0 = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            times.append((time.perf_counter() - t0) * 1000)
+        times.sort()
+        print(f"  {name:<32} p50 {times[len(times) // 2]:8.2f} ms  p95 {times[int(len(times) * 0.95)]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repos', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.sqlite3")
+        table = Script.__table__
+        with engine.begin() as conn:
+            conn.execute(CreateTable(table))
+            start = time.perf_counter()
+            per_repo = populate(conn, args.rows, args.repos)
+        print(f"inserted {per_repo * args.repos} rows in {time.perf_counter() - start:.1f}s")
+        cases = queries(args.repos, per_repo)
+
+        with engine.connect() as conn:
+            print("without secondary indexes:")
+            run(conn, cases, args.queries)
+        with engine.begin() as conn:
+            for index in table.indexes:
+                index.create(conn)
+            conn.execute(text("ANALYZE"))
+        with engine.connect() as conn:
+            print("with " + ", ".join(sorted(i.name for i in table.indexes)) + ":")
+            run(conn, cases, args.queries)
+
+
+if __name__ == '__main__':
+    main()
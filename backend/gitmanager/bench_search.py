@@ -0,0 +1,88 @@
+"""Benchmark: /git/search query latency on a synthetic full-text index.
+Usage:
+  python backend/gitmanager/bench_search.py [--scripts N] [--queries N] [--limit N]
+A temporary index with --scripts synthetic scripts is generated (SEARCH_INDEX_PATH is
+overridden), then a mix of rare, common and prefix queries is timed.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ensure project root is on sys.path so `backend` package can be imported
+repo_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(repo_root))
+
+WORDS = ("login logout session router switch vlan ospf bgp interface port optical alarm "
+         "traffic latency throughput restart upgrade firmware backup restore config "
+         "snmp netconf ssh telnet ping trace link lag mpls ldp rsvp tunnel qos").split()
+
+
+def make_rows(n: int):
+    rnd = random.Random(42)
+    for i in range(n):
+        words = rnd.sample(WORDS, 6)
+        yield SimpleNamespace(
+            id=i + 1,
+            path=f"/repos/bench/suite{i % 100}/test_{words[0]}_{i}.py",
+            filename=f"test_{words[0]}_{i}.py",
+            description=f"Check {words[1]} {words[2]} after {words[3]}",
+            topology=f"{rnd.randint(1, 8)}nodes",
+            author=rnd.choice(["alice", "bob", "carol", "dave"]),
+            functions_doc='[{"name": "run_%s", "doc": "Run the %s %s scenario."}]' % (words[4], words[4], words[5]),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scripts', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SEARCH_INDEX_PATH'] = str(Path(tmp) / 'search.sqlite3')
+        os.environ['SEARCH_INDEX_ENABLED'] = 'true'
+        from backend.gitmanager import searchindex
+
+        conn = searchindex._conn()
+        repo = SimpleNamespace(id=1, name='bench', local_path='/repos/bench')
+        start = time.perf_counter()
+        batch = []
+        conn.execute("BEGIN")
+        for row in make_rows(args.scripts):
+            batch.append(row)
+            if len(batch) >= 1000:
+                searchindex._insert(conn, repo, batch)
+                batch = []
+        searchindex._insert(conn, repo, batch)
+        conn.execute("COMMIT")
+        conn.execute("INSERT INTO scripts_fts (scripts_fts) VALUES ('optimize')")
+        print(f"indexed {args.scripts} scripts in {time.perf_counter() - start:.1f}s")
+
+        rnd = random.Random(7)
+        kinds = {
+            'rare (2 words)': lambda: f"{rnd.choice(WORDS)} {rnd.choice(WORDS)}",
+            'common (1 word)': lambda: rnd.choice(WORDS),
+            'prefix': lambda: rnd.choice(WORDS)[:3],
+            'filtered by repo': lambda: rnd.choice(WORDS),
+        }
+        for name, make in kinds.items():
+            repo_id = 1 if name == 'filtered by repo' else None
+            times = []
+            for _ in range(args.queries):
+                q = make()
+                t0 = time.perf_counter()
+                searchindex.search(q, repo_id=repo_id, limit=args.limit)
+                times.append((time.perf_counter() - t0) * 1000)
+            times.sort()
+            print(f"{name:<18} p50 {times[len(times) // 2]:7.2f} ms  p95 {times[int(len(times) * 0.95)]:7.2f} ms"
+                  f"  max {times[-1]:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Pools of long-lived `git cat-file --batch` / `--batch-check` processes per repo.
+
+Starting a `git` subprocess per read costs milliseconds; a persistent cat-file
+process answers each lookup with a single pipe round trip. Each repo gets a small
+pool (`settings.CATFILE_POOL_SIZE`) of each kind, shared by request threads: a
+thread borrows a process, runs one request and gives it back. A process that dies
+or exceeds `settings.CATFILE_TIMEOUT` is killed and replaced on next use.
+"""
+import logging
+import os
+import queue
+import select
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ObjectMissing(LookupError):
+    pass
+
+
+class CatFileProcess:
+    """One `git cat-file --batch[-check]` process with timeout-aware pipe reads."""
+
+    def __init__(self, repo_dir: str, check_only: bool):
+        self.check_only = check_only
+        self._buf = bytearray()
+        self._proc = subprocess.Popen(
+            ['git', 'cat-file', '--batch-check' if check_only else '--batch'],
+            cwd=repo_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            bufsize=0,
+        )
+        self._fd = self._proc.stdout.fileno()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def request(self, spec: str, timeout: float) -> Tuple[str, str, int, Optional[bytes]]:
+        """Look up one object; returns (sha, type, size, data) with data None for --batch-check."""
+        if '\n' in spec:
+            raise ObjectMissing(spec)
+        deadline = time.monotonic() + timeout
+        self._proc.stdin.write(spec.encode('utf-8') + b'\n')
+        self._proc.stdin.flush()
+        header = self._read_until_newline(deadline).decode('utf-8', 'replace')
+        parts = header.rsplit(' ', 2)
+        if len(parts) != 3 or parts[2] in ('missing', 'ambiguous'):
+            raise ObjectMissing(spec)
+        sha, obj_type, size = parts[0], parts[1], int(parts[2])
+        if self.check_only:
+            return sha, obj_type, size, None
+        data = self._read_exact(size + 1, deadline)  # content + trailing LF
+        return sha, obj_type, size, bytes(data[:-1])
+
+    def _fill(self, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError('git cat-file timed out')
+        ready, _, _ = select.select([self._fd], [], [], remaining)
+        if not ready:
+            raise TimeoutError('git cat-file timed out')
+        chunk = os.read(self._fd, 65536)
+        if not chunk:
+            raise BrokenPipeError('git cat-file exited')
+        self._buf += chunk
+
+    def _read_until_newline(self, deadline: float) -> bytes:
+        while True:
+            idx = self._buf.find(b'\n')
+            if idx >= 0:
+                line = bytes(self._buf[:idx])
+                del self._buf[:idx + 1]
+                return line
+            self._fill(deadline)
+
+    def _read_exact(self, n: int, deadline: float) -> bytes:
+        while len(self._buf) < n:
+            self._fill(deadline)
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+    def close(self):
+        try:
+            self._proc.kill()
+            self._proc.wait(timeout=1)
+        except Exception:
+            pass
+
+
+class CatFilePool:
+    """Bounded pool of --batch and --batch-check processes for one repository."""
+
+    def __init__(self, repo_dir: str, size: int, timeout: float):
+        self.repo_dir = repo_dir
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = {True: queue.LifoQueue(), False: queue.LifoQueue()}
+        self._spawned = {True: 0, False: 0}
+        self._lock = threading.Lock()
+        self.restarts = 0
+
+    @contextmanager
+    def _borrow(self, check_only: bool) -> Iterator[CatFileProcess]:
+        proc = None
+        try:
+            proc = self._idle[check_only].get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_spawn = self._spawned[check_only] < self.size
+                if can_spawn:
+                    self._spawned[check_only] += 1
+            if can_spawn:
+                try:
+                    proc = CatFileProcess(self.repo_dir, check_only)
+                except Exception:
+                    with self._lock:
+                        self._spawned[check_only] -= 1
+                    raise
+            else:
+                try:
+                    proc = self._idle[check_only].get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError('no git cat-file process available')
+        if not proc.alive:
+            try:
+                proc = self._replace(proc)
+            except Exception:
+                # give the slot back: a later borrow spawns a fresh process
+                with self._lock:
+                    self._spawned[check_only] -= 1
+                raise
+        try:
+            yield proc
+        except (TimeoutError, BrokenPipeError, OSError):
+            # the process is in an unknown state (partial output): replace it
+            proc = self._replace(proc)
+            raise
+        finally:
+            self._idle[check_only].put(proc)
+
+    def _replace(self, proc: CatFileProcess) -> CatFileProcess:
+        proc.close()
+        self.restarts += 1
+        logger.info('restarting git cat-file process for %s', self.repo_dir)
+        return CatFileProcess(self.repo_dir, proc.check_only)
+
+    def _request(self, check_only: bool, spec: str):
+        try:
+            with self._borrow(check_only) as proc:
+                return proc.request(spec, self.timeout)
+        except BrokenPipeError:
+            # the process died between requests: retry once on its replacement
+            with self._borrow(check_only) as proc:
+                return proc.request(spec, self.timeout)
+
+    def info(self, spec: str) -> Tuple[str, str, int]:
+        """Return (sha, type, size) of an object spec such as 'main:path/to/file'."""
+        sha, obj_type, size, _ = self._request(True, spec)
+        return sha, obj_type, size
+
+    def read(self, spec: str) -> Tuple[str, str, bytes]:
+        """Return (sha, type, data) of an object spec."""
+        sha, obj_type, _size, data = self._request(False, spec)
+        return sha, obj_type, data
+
+    def close(self):
+        for q in self._idle.values():
+            while True:
+                try:
+                    q.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+def parse_tree(data: bytes) -> List[Tuple[str, str, str]]:
+    """Parse raw tree object content into (mode, name, sha) tuples."""
+    entries = []
+    i = 0
+    n = len(data)
+    while i < n:
+        sp = data.index(b' ', i)
+        nul = data.index(b'\0', sp)
+        mode = data[i:sp].decode('ascii')
+        name = data[sp + 1:nul].decode('utf-8', 'surrogateescape')
+        sha = data[nul + 1:nul + 21].hex()
+        entries.append((mode, name, sha))
+        i = nul + 21
+    return entries
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(repo_dir) -> CatFilePool:
+    """Return the shared pool for a repository directory, creating it on first use."""
+    key = str(Path(repo_dir))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = CatFilePool(key, settings.CATFILE_POOL_SIZE, settings.CATFILE_TIMEOUT)
+            _pools[key] = pool
+        return pool
+
+
+def close_all():
+    """Terminate every pooled process (application shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
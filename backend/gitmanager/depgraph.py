@@ -0,0 +1,153 @@
+"""Import dependency graph between the scripts of a repo, for impacted-test selection.
+
+The parser stores each script's import statements as written (`Script.imports_doc`).
+`update` resolves them against the repo layout, i.e. the indexed .py files, the way
+Python would when the script is run directly: from the script's own directory, then
+the repo root, then the extra `DEPENDENCY_ROOTS`. A resolved import becomes one
+`script_dependencies` row per repo file it loads (the module, the `__init__.py` of
+its parent packages and imported submodules). Imports of the standard library or of
+installed packages resolve to nothing and are ignored.
+
+When files are added or removed, the imports of other scripts may resolve differently,
+so the scripts whose imports mention the name of such a file are resolved again too.
+`affected` walks the reverse edges from a set of changed files.
+"""
+import json
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.db.models import Script, ScriptDependency
+
+# rows read or deleted per statement
+_CHUNK = 500
+# above this many added/removed files every script of the repo is resolved again
+FULL_RESOLVE_THRESHOLD = 200
+
+
+def _module_file(parts: List[str], files: Set[str]):
+    base = "/".join(parts)
+    for candidate in (base + ".py", base + "/__init__.py"):
+        if candidate in files:
+            return candidate
+    return None
+
+
+def _resolve_at(root: List[str], parts: List[str], names: List[str], files: Set[str]) -> List[str]:
+    """Files loaded by the import when `root` is the directory it is searched from; [] if not found there."""
+    if parts:
+        module = _module_file(root + parts, files)
+    else:
+        # `from . import x`: the package itself
+        module = "/".join(root + ["__init__.py"]) if root else None
+        module = module if module in files else None
+    submodules = [m for m in (_module_file(root + parts + [n], files) for n in names) if m]
+    if module is None and not submodules:
+        return []
+    inits = ["/".join(root + parts[:i] + ["__init__.py"]) for i in range(1, len(parts))]
+    return [f for f in inits if f in files] + ([module] if module else []) + submodules
+
+
+def resolve_imports(rel_path: str, imports: Iterable[dict], files: Set[str], roots: List[str] = None) -> Set[str]:
+    """Return the repo files (repo-relative) loaded by the imports of the script at `rel_path`."""
+    if roots is None:
+        roots = settings.DEPENDENCY_ROOTS
+    script_dir = rel_path.split("/")[:-1]
+    search_roots = [script_dir] + [[]] + [r.split("/") for r in roots]
+    targets = set()
+    for imp in imports or []:
+        parts = [p for p in (imp.get("module") or "").split(".") if p]
+        names = [n for n in imp.get("names") or [] if n != "*"]
+        level = imp.get("level") or 0
+        if level:
+            if level - 1 > len(script_dir):
+                continue
+            candidates = [script_dir[:len(script_dir) - (level - 1)]]
+        else:
+            candidates = search_roots
+        for root in candidates:
+            found = _resolve_at(root, parts, names, files)
+            if found:
+                targets.update(found)
+                break
+    targets.discard(rel_path)
+    return targets
+
+
+def _stem(rel_path: str) -> str:
+    parts = rel_path.split("/")
+    if parts[-1] == "__init__.py":
+        return parts[-2] if len(parts) > 1 else ""
+    return parts[-1][:-3] if parts[-1].endswith(".py") else parts[-1]
+
+
+def update(db: Session, repo_id: int, script_ids: Iterable[int], layout_changes: Iterable[str] = ()):
+    """Re-resolve the dependencies of `script_ids` and of the scripts affected by added/removed files.
+
+    `layout_changes` are the repo-relative paths of scripts added or removed in this sync.
+    Runs inside the caller's transaction.
+    """
+    ids = set(script_ids)
+    changes = set(layout_changes)
+    if len(changes) > FULL_RESOLVE_THRESHOLD:
+        ids.update(i for (i,) in db.query(Script.id).filter(Script.repo_id == repo_id))
+    elif changes:
+        # coarse filter on the stored JSON; resolution below is exact
+        for stem in {_stem(p) for p in changes if _stem(p)}:
+            q = db.query(Script.id).filter(Script.repo_id == repo_id,
+                                           Script.imports_doc.contains(stem, autoescape=True))
+            ids.update(i for (i,) in q)
+    if not ids:
+        return
+
+    files = {p for (p,) in db.query(Script.rel_path).filter(Script.repo_id == repo_id) if p}
+    ids = list(ids)
+    for i in range(0, len(ids), _CHUNK):
+        chunk = ids[i:i + _CHUNK]
+        db.query(ScriptDependency).filter(ScriptDependency.script_id.in_(chunk)).delete(synchronize_session=False)
+        rows = []
+        q = db.query(Script.id, Script.rel_path, Script.imports_doc).filter(Script.id.in_(chunk))
+        for script_id, rel_path, imports_doc in q:
+            try:
+                imports = json.loads(imports_doc) if imports_doc else []
+            except ValueError:
+                imports = []
+            for target in sorted(resolve_imports(rel_path or "", imports, files)):
+                rows.append({"script_id": script_id, "repo_id": repo_id, "target_path": target})
+        if rows:
+            db.bulk_insert_mappings(ScriptDependency, rows)
+
+
+def delete(db: Session, script_ids: List[int]):
+    """Drop the outgoing edges of deleted scripts (edges pointing to them are re-resolved by `update`)."""
+    db.query(ScriptDependency).filter(ScriptDependency.script_id.in_(script_ids)).delete(synchronize_session=False)
+
+
+def affected(db: Session, repo_id: int, rel_paths: Iterable[str]) -> Dict[str, int]:
+    """Return {rel_path: depth} of the scripts that import, directly or transitively, a changed file.
+
+    Changed files that are indexed scripts themselves are included with depth 0.
+    """
+    changed = set(rel_paths)
+    result = {}
+    for chunk in _chunks(list(changed)):
+        for (rel_path,) in db.query(Script.rel_path).filter(Script.repo_id == repo_id, Script.rel_path.in_(chunk)):
+            result[rel_path] = 0
+    frontier, depth = changed, 0
+    while frontier:
+        depth += 1
+        found = set()
+        for chunk in _chunks(list(frontier)):
+            q = db.query(Script.rel_path).join(ScriptDependency, ScriptDependency.script_id == Script.id) \
+                .filter(ScriptDependency.repo_id == repo_id, ScriptDependency.target_path.in_(chunk))
+            found.update(p for (p,) in q if p and p not in result and p not in changed)
+        for p in found:
+            result[p] = depth
+        frontier = found
+    return result
+
+
+def _chunks(items: list):
+    for i in range(0, len(items), _CHUNK):
+        yield items[i:i + _CHUNK]
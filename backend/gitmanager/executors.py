@@ -0,0 +1,238 @@
+"""Bounded thread pools for blocking filesystem and git handlers.
+
+Plain `def` endpoints all share Starlette's default threadpool, so slow directory
+walks or git operations could starve cheap DB endpoints. Handlers decorated with
+`offload("fs")` or `offload("git")` run on a dedicated pool instead. Each pool has a
+fixed number of workers and a limit on queued calls: once full, new requests are
+rejected with 503 + Retry-After instead of piling up. `iterate` runs a streaming
+response's generator on the same pool; each open stream holds one slot of that limit
+until it ends, so a full pool also refuses new streams with 503. `stats()` reports
+per-pool saturation.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict
+
+from fastapi import HTTPException
+
+from backend.core.config import settings
+
+
+class Saturated(Exception):
+    """Raised when a pool's workers are busy and its queue is full."""
+
+
+class BoundedExecutor:
+    """A ThreadPoolExecutor with a cap on outstanding calls and usage counters."""
+
+    def __init__(self, name: str, workers: int, queue_limit: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{name}-io")
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        self._lock = threading.Lock()
+        self._counters = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "running": 0, "queued": 0, "max_queued": 0, "streams": 0,
+            "wait_seconds_total": 0.0, "max_wait_seconds": 0.0, "run_seconds_total": 0.0,
+        }
+
+    def submit(self, fn, *args, force: bool = False, **kwargs) -> Future:
+        """Schedule fn(*args, **kwargs); raise Saturated when the pool is full.
+
+        `force` skips the limit, for follow-up work of an already admitted request
+        (e.g. the next chunk of a response that is being streamed).
+        """
+        acquired = self._slots.acquire(blocking=False)
+        if not acquired and not force:
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise Saturated(self.name)
+        enqueued = time.monotonic()
+        ctx = contextvars.copy_context()
+
+        def run():
+            started = time.monotonic()
+            c = self._counters
+            with self._lock:
+                c["queued"] -= 1
+                c["running"] += 1
+                c["wait_seconds_total"] += started - enqueued
+                c["max_wait_seconds"] = max(c["max_wait_seconds"], started - enqueued)
+            ok = False
+            try:
+                result = ctx.run(fn, *args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    c["running"] -= 1
+                    c["completed" if ok else "failed"] += 1
+                    c["run_seconds_total"] += time.monotonic() - started
+                if acquired:
+                    self._slots.release()
+
+        with self._lock:
+            self._counters["submitted"] += 1
+            self._counters["queued"] += 1
+            self._counters["max_queued"] = max(self._counters["max_queued"], self._counters["queued"])
+        try:
+            return self._pool.submit(run)
+        except Exception:
+            with self._lock:
+                self._counters["queued"] -= 1
+            if acquired:
+                self._slots.release()
+            raise
+
+    async def run(self, fn, *args, force: bool = False, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, force=force, **kwargs))
+
+    def admit_stream(self):
+        """Reserve a slot for the whole life of a streaming response; raise Saturated when full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise Saturated(self.name)
+        with self._lock:
+            self._counters["streams"] += 1
+
+    def release_stream(self):
+        with self._lock:
+            self._counters["streams"] -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "queue_limit": self.queue_limit, **self._counters}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_pools: Dict[str, BoundedExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def get(name: str) -> BoundedExecutor:
+    """Return the named pool ('fs' or 'git'), creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            if name == "fs":
+                pool = BoundedExecutor("fs", settings.FS_WORKERS, settings.FS_QUEUE_LIMIT)
+            elif name == "git":
+                pool = BoundedExecutor("git", settings.GIT_WORKERS, settings.GIT_QUEUE_LIMIT)
+            else:
+                raise KeyError(name)
+            _pools[name] = pool
+        return pool
+
+
+def offload(name: str):
+    """Decorator: run a blocking endpoint on the named pool instead of the default threadpool.
+
+    The wrapped function keeps its signature, so FastAPI still resolves its parameters
+    and dependencies from it.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await get(name).run(fn, *args, **kwargs)
+            except Saturated:
+                raise _busy(name)
+        return wrapper
+    return decorator
+
+
+def _busy(name: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Server busy ({name} pool saturated)",
+                         headers={"Retry-After": "1"})
+
+
+class _Stream:
+    """Async iterator pulling items of a blocking iterator on a pool, holding one pool slot.
+
+    The slot is released when the iterator is exhausted, fails or is closed, and at the
+    latest when the stream is garbage collected (a response dropped before its body
+    was iterated never runs the iterator).
+    """
+
+    _done = object()
+
+    def __init__(self, pool: BoundedExecutor, iterator):
+        self._pool = pool
+        self._it = iter(iterator)
+        self._open = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._open:
+            raise StopAsyncIteration
+        try:
+            # the stream already holds a slot: its chunk reads do not take another one
+            item = await self._pool.run(next, self._it, self._done, force=True)
+        except BaseException:
+            self.close()
+            raise
+        if item is self._done:
+            self.close()
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        self.close()
+
+    def close(self):
+        if not self._open:
+            return
+        self._open = False
+        try:
+            close = getattr(self._it, "close", None)
+            if close is not None:
+                close()
+        except ValueError:
+            # still running a step on the pool (cancelled request): it ends with that step
+            pass
+        finally:
+            self._pool.release_stream()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def iterate(name: str, iterator) -> _Stream:
+    """Return an async iterator pulling items of a blocking iterator on the named pool.
+
+    Call it while building the response: the stream takes one slot of the pool's limit
+    for as long as it is open, and a full pool raises 503 (HTTPException) right away.
+    """
+    pool = get(name)
+    try:
+        pool.admit_stream()
+    except Saturated:
+        raise _busy(name)
+    return _Stream(pool, iterator)
+
+
+def stats() -> dict:
+    with _pools_lock:
+        return {name: pool.stats() for name, pool in _pools.items()}
+
+
+def shutdown():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
+        _pools.clear()
@@ -0,0 +1,100 @@
+"""Read files and directories of a repo at any git ref, straight from the object database.
+
+Unlike the filesystem endpoints these reads never touch the shared working tree, so
+any number of branches/tags/commits can be browsed concurrently without a checkout.
+Objects are fetched through the repo's pool of persistent `git cat-file` processes
+(see catfile.py) instead of spawning a git subprocess per call.
+"""
+import posixpath
+from pathlib import Path
+from typing import List, Tuple
+
+from backend.gitmanager import catfile
+
+# tree entry modes that denote file content (regular, executable, symlink)
+_BLOB_MODES = ('100644', '100755', '120000', '100664')
+
+
+class RefNotFound(LookupError):
+    pass
+
+
+class PathNotFound(LookupError):
+    pass
+
+
+class NotADirectory(ValueError):
+    pass
+
+
+class NotAFile(ValueError):
+    pass
+
+
+def normalize_path(path: str) -> str:
+    """Normalise a repo-relative path for tree lookups ('' is the root).
+
+    Raises PermissionError for absolute paths or paths escaping the repo root.
+    """
+    p = (path or '.').replace('\\', '/')
+    if p.startswith('/'):
+        raise PermissionError(path)
+    p = posixpath.normpath(p)
+    if p == '.':
+        return ''
+    if p == '..' or p.startswith('../'):
+        raise PermissionError(path)
+    return p
+
+
+def _read(repo_dir: Path, ref: str, rel: str) -> Tuple[str, str, bytes]:
+    """Return (sha, type, data) of `rel` at `ref` ('' = the root tree)."""
+    if not ref or ref.startswith('-') or '\n' in ref:
+        # never let a ref be interpreted as an option or break the batch protocol
+        raise RefNotFound(ref)
+    pool = catfile.get_pool(repo_dir)
+    spec = f"{ref}:{rel}" if rel else f"{ref}^{{tree}}"
+    try:
+        return pool.read(spec)
+    except catfile.ObjectMissing:
+        pass
+    try:
+        pool.info(f"{ref}^{{commit}}")
+    except catfile.ObjectMissing:
+        raise RefNotFound(ref)
+    raise PathNotFound(rel)
+
+
+def _tree(repo_dir: Path, ref: str, path: str):
+    rel = normalize_path(path)
+    _sha, obj_type, data = _read(repo_dir, ref, rel)
+    if obj_type != 'tree':
+        raise NotADirectory(rel)
+    prefix = rel + '/' if rel else ''
+    return [(mode, name, prefix + name, sha) for mode, name, sha in catfile.parse_tree(data)]
+
+
+def list_dir(repo_dir: Path, ref: str, path: str) -> List[Tuple[str, str, bool]]:
+    """Return (name, repo-relative path, is_dir) for the entries of a directory at `ref`, sorted by name."""
+    # submodules (mode 160000) are shown as directories, like on disk
+    return sorted((name, rel, mode not in _BLOB_MODES) for mode, name, rel, _sha in _tree(repo_dir, ref, path))
+
+
+def read_file(repo_dir: Path, ref: str, path: str) -> Tuple[str, bytes]:
+    """Return (blob SHA, raw bytes) of a file at `ref`."""
+    rel = normalize_path(path)
+    sha, obj_type, data = _read(repo_dir, ref, rel)
+    if obj_type != 'blob':
+        raise NotAFile(rel)
+    return sha, data
+
+
+def list_files(repo_dir: Path, ref: str, path: str) -> List[Tuple[str, str]]:
+    """Return (repo-relative path, blob SHA) for the files directly under a directory at `ref`."""
+    return sorted((rel, sha) for mode, _name, rel, sha in _tree(repo_dir, ref, path) if mode in _BLOB_MODES)
+
+
+def read_blobs(repo_dir: Path, shas) -> dict:
+    """Return {blob SHA: raw bytes} for the given blob SHAs."""
+    pool = catfile.get_pool(repo_dir)
+    return {sha: pool.read(sha)[2] for sha in shas}
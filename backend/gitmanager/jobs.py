@@ -0,0 +1,162 @@
+"""Background sync jobs for /git/sync.
+
+A sync (clone/checkout + index) can take minutes on large repos, so the HTTP handler
+only enqueues a SyncJob and returns its id. Jobs run on a bounded thread pool
+(`settings.SYNC_JOB_WORKERS`); a sync requested for a repo that already has a queued
+or running job with the same parameters attaches to that job instead of starting a
+duplicate, while one with different parameters is refused with SyncConflict.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from backend.core.config import settings
+from backend.db.session import SessionLocal
+from backend.gitmanager.service import clone_or_pull
+
+logger = logging.getLogger(__name__)
+
+
+class SyncJob:
+    """State and progress of one repository sync."""
+
+    def __init__(self, name: str, url: str, branch: str, full_rescan: bool, fetch: bool = False,
+                 clone_options: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.url = url
+        self.branch = branch
+        self.full_rescan = full_rescan
+        self.fetch = fetch
+        self.clone_options = clone_options or {}
+        self.status = "queued"  # queued | running | done | failed
+        self.phase = "queued"
+        self.files_scanned = 0
+        self.files_total = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.errors = []
+        self.result = None
+        self._done = threading.Event()
+
+    def same_request(self, url: str, branch: str, full_rescan: bool, fetch: bool,
+                     clone_options: Optional[dict]) -> bool:
+        return (self.url, self.branch, self.full_rescan, self.fetch, self.clone_options) == \
+            (url, branch, full_rescan, fetch, clone_options or {})
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def progress(self, phase: str, done: Optional[int] = None, total: Optional[int] = None):
+        self.phase = phase
+        if done is not None:
+            self.files_scanned = done
+        if total is not None:
+            self.files_total = total
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "repo": self.name,
+            "branch": self.branch,
+            "status": self.status,
+            "phase": self.phase,
+            "files_scanned": self.files_scanned,
+            "files_total": self.files_total,
+            "elapsed": round(end - self.started_at, 3) if self.started_at else 0.0,
+            "queued_for": round((self.started_at or end) - self.created_at, 3),
+            "errors": list(self.errors),
+            "result": self.result,
+        }
+
+
+class SyncConflict(Exception):
+    """A sync of the repo with different parameters is already queued or running."""
+
+    def __init__(self, job: SyncJob):
+        super().__init__(f"sync job {job.id} for repo '{job.name}' is already {job.status} with different options")
+        self.job = job
+
+
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=max(1, settings.SYNC_JOB_WORKERS), thread_name_prefix="sync-job")
+# all known jobs (bounded: oldest finished jobs are dropped) and the active job per repo
+_jobs = OrderedDict()
+_active = {}
+
+
+def submit_sync(name: str, url: str, branch: str = "main", full_rescan: bool = False, fetch: bool = False,
+                clone_options: Optional[dict] = None) -> Tuple[SyncJob, bool]:
+    """Enqueue a sync for `name` and return (job, attached).
+
+    `attached` is True when an existing queued/running job for the same repo and the
+    same parameters was returned instead of creating a new one. Raises SyncConflict
+    when the active job of the repo was requested with different parameters.
+    """
+    with _lock:
+        job = _active.get(name)
+        if job is not None:
+            if not job.same_request(url, branch, full_rescan, fetch, clone_options):
+                raise SyncConflict(job)
+            return job, True
+        job = SyncJob(name, url, branch, full_rescan, fetch=fetch, clone_options=clone_options)
+        _jobs[job.id] = job
+        _active[name] = job
+        _trim_history()
+    _executor.submit(_run, job)
+    return job, False
+
+
+def get_job(job_id: str) -> Optional[SyncJob]:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def active_jobs() -> dict:
+    """Return a snapshot of the queued/running job per repo name."""
+    with _lock:
+        return dict(_active)
+
+
+def _trim_history():
+    # caller holds _lock
+    overflow = len(_jobs) - max(1, settings.SYNC_JOB_HISTORY)
+    if overflow <= 0:
+        return
+    for job_id in list(_jobs):
+        if overflow <= 0:
+            break
+        if _jobs[job_id].status in ("done", "failed"):
+            del _jobs[job_id]
+            overflow -= 1
+
+
+def _run(job: SyncJob):
+    job.status = "running"
+    job.started_at = time.time()
+    db = SessionLocal()
+    try:
+        repo, counts, mode = clone_or_pull(db, job.name, job.url, job.branch,
+                                           full_rescan=job.full_rescan, progress=job.progress,
+                                           fetch=job.fetch, clone_options=job.clone_options)
+        job.result = dict(counts, mode=mode, commit=repo.last_indexed_commit, local_path=repo.local_path)
+        job.phase = "done"
+        job.status = "done"
+    except Exception as e:
+        logger.exception("sync job %s for repo %s failed", job.id, job.name)
+        job.errors.append(str(e))
+        job.status = "failed"
+    finally:
+        db.close()
+        job.finished_at = time.time()
+        with _lock:
+            if _active.get(job.name) is job:
+                del _active[job.name]
+        job._done.set()
@@ -0,0 +1,100 @@
+"""In-process LRU cache of working-tree file metadata for /fs/meta and /fs/meta-dir.
+
+Entries are keyed by (repo, repo-relative path) and carry the (mtime_ns, size, inode)
+of the file they were parsed from: a lookup with a different stat is a miss and the
+entry is re-parsed. Memory use is estimated per entry and bounded by
+`settings.META_CACHE_MAX_BYTES`; the least recently used entries are evicted first.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from backend.core.config import settings
+from backend.gitmanager import metadata
+
+# rough per-entry overhead of the key tuple, stat tuple and OrderedDict node
+_ENTRY_OVERHEAD = 400
+
+_lock = threading.Lock()
+_entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+_size = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def _stat_key(st: os.stat_result) -> tuple:
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _cost(rel: str, meta: dict) -> int:
+    cost = _ENTRY_OVERHEAD + sys.getsizeof(rel)
+    for value in meta.values():
+        cost += sys.getsizeof(value)
+    return cost
+
+
+def _remove(key):
+    global _size
+    entry = _entries.pop(key, None)
+    if entry is not None:
+        _size -= entry[2]
+    return entry
+
+
+def get_meta(repo: str, rel: str, file_path: Path, st: Optional[os.stat_result] = None) -> dict:
+    """Return metadata.file_meta(file_path), reusing the cached result while the file's stat is unchanged.
+
+    `st` may be passed when the caller already has it (e.g. from os.scandir).
+    """
+    global _size
+    if st is None:
+        st = os.stat(file_path)
+    key = (repo, rel)
+    stat_key = _stat_key(st)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == stat_key:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+    meta = metadata.file_meta(file_path)
+    cost = _cost(rel, meta)
+    with _lock:
+        _remove(key)
+        if cost <= settings.META_CACHE_MAX_BYTES:
+            _entries[key] = (stat_key, meta, cost)
+            _size += cost
+        while _size > settings.META_CACHE_MAX_BYTES and _entries:
+            _remove(next(iter(_entries)))
+            _stats["evictions"] += 1
+    return meta
+
+
+def invalidate(repo: str, rel_paths: Optional[List[str]] = None):
+    """Drop cached entries for `rel_paths` of `repo`, or for the whole repo when None.
+
+    Matches the watcher invalidation hook signature.
+    """
+    with _lock:
+        if rel_paths is None:
+            keys = [k for k in _entries if k[0] == repo]
+        else:
+            keys = [(repo, rel) for rel in rel_paths]
+        for key in keys:
+            if _remove(key) is not None:
+                _stats["invalidations"] += 1
+
+
+def clear():
+    global _size
+    with _lock:
+        _entries.clear()
+        _size = 0
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "entries": len(_entries), "bytes": _size, "max_bytes": settings.META_CACHE_MAX_BYTES}
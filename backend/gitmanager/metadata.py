@@ -0,0 +1,97 @@
+"""Header-only metadata extraction shared by /fs/meta, /fs/meta-dir and the sync parser.
+
+Only the first HEADER_BYTES bytes of a file are read. The metadata block is the first
+triple-quoted string found there (or, failing that, the leading block of '#' comments);
+fields are taken from ':field Key: value' lines, or from plain 'Key: value' lines when
+no explicit field is present, and the description falls back to the first line of
+the first paragraph.
+"""
+import re
+from pathlib import Path
+
+# bump when extract_meta output changes so cached results are invalidated
+VERSION = 2
+
+HEADER_BYTES = 4096
+
+_DOCSTRING_RE = re.compile(r"(?P<quote>['\"]{3})(?P<doc>.*?)(?P=quote)", re.S)
+_FIELD_RE = re.compile(r'(?i)^:?field\s+(description|desc|topology|author)\s*:\s*(.+)$')
+_KEY_VALUE_RE = re.compile(r'(?i)^(description|desc|topology|author)\s*:\s*(.+)$')
+_KEYS = {"description": "description", "desc": "description", "topology": "topology", "author": "author"}
+
+
+def read_header(file_path: Path, limit: int = HEADER_BYTES) -> bytes:
+    """Return at most `limit` bytes from the start of a file."""
+    with open(file_path, 'rb') as f:
+        return f.read(limit)
+
+
+def header_text(data: bytes, limit: int = HEADER_BYTES) -> str:
+    """Decode the first `limit` bytes of `data` as UTF-8 with universal newlines.
+
+    A multi-byte character cut by the limit is dropped; any other invalid UTF-8
+    raises UnicodeDecodeError, like Path.read_text(encoding='utf-8') would.
+    """
+    head = data[:limit]
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        if len(data) <= limit or e.start < len(head) - 3 or e.reason != 'unexpected end of data':
+            raise
+        text = head[:e.start].decode('utf-8')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _header_doc(text: str) -> str:
+    m = _DOCSTRING_RE.search(text)
+    doc = m.group('doc').strip() if m else ''
+    if doc:
+        return doc
+    # fallback: the first block of consecutive '#' comment lines (blank lines before it are skipped)
+    comment_lines = []
+    for line in text.splitlines():
+        s = line.strip()
+        if not s:
+            if comment_lines:
+                break
+            continue
+        if not s.startswith('#'):
+            break
+        comment_lines.append(s.lstrip('#').strip())
+    return '\n'.join(comment_lines).strip()
+
+
+def extract_meta(text: str) -> dict:
+    """Return description/topology/author (and which were explicit ':field' lines) from a header."""
+    values = {"description": None, "topology": None, "author": None}
+    explicit_fields = {"description": False, "topology": False, "author": False}
+    doc = _header_doc(text)
+    if doc:
+        lines = [line.strip() for line in doc.splitlines() if line.strip()]
+        for line in lines:
+            m = _FIELD_RE.match(line)
+            if m:
+                key = _KEYS[m.group(1).lower()]
+                values[key] = m.group(2).strip()
+                explicit_fields[key] = True
+        # plain 'Key: value' lines are only used when no explicit field is present
+        if not any(explicit_fields.values()):
+            for line in lines:
+                m = _KEY_VALUE_RE.match(line)
+                if m:
+                    values[_KEYS[m.group(1).lower()]] = m.group(2).strip()
+        if not values["description"]:
+            paragraphs = [p.strip() for p in doc.split('\n\n') if p.strip()]
+            if paragraphs:
+                values["description"] = paragraphs[0].splitlines()[0].strip()
+    return {**values, "explicit_fields": explicit_fields}
+
+
+def file_meta(file_path: Path) -> dict:
+    """extract_meta for a file on disk, reading only its header."""
+    return extract_meta(header_text(read_header(file_path, HEADER_BYTES + 1)))
+
+
+def blob_meta(data: bytes) -> dict:
+    """extract_meta for content already in memory (e.g. a git blob)."""
+    return extract_meta(header_text(data))
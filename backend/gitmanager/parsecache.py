@@ -0,0 +1,142 @@
+"""Persistent, content-addressed cache for parser results.
+
+Entries are keyed by (kind, git blob SHA) so identical file content found on other
+branches, forks or repos under REPOS_BASE_PATH is parsed only once. Each entry also
+stores the parser version that produced it: bumping the version of a parser makes
+its old entries miss (and be overwritten). The cache is a local SQLite file, safe to
+share between threads and the parser worker processes, and is bounded by
+`settings.PARSE_CACHE_MAX_BYTES` with least-recently-used eviction; a hit refreshes
+an entry's recency at most once per `_TOUCH_INTERVAL`.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+# scan and request threads share the counter (each worker process has its own)
+_puts_lock = threading.Lock()
+_puts_since_check = 0
+# how many writes may happen between two size checks (sum over the table)
+_EVICT_CHECK_EVERY = 200
+# a hit only rewrites last_used when the stored value is older than this (seconds):
+# eviction needs a coarse recency, not one write per read
+_TOUCH_INTERVAL = 3600
+
+
+def blob_sha(data: bytes) -> str:
+    """Return the git blob SHA-1 of `data` (same value as `git hash-object`)."""
+    h = hashlib.sha1(b"blob %d\0" % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def read_source(file_path: Path) -> Tuple[str, str]:
+    """Read a text file once and return (blob_sha, text).
+
+    The text is decoded as UTF-8 with universal newlines, i.e. the same string
+    `Path.read_text(encoding='utf-8')` returns.
+    """
+    data = file_path.read_bytes()
+    return blob_sha(data), decode_text(data)
+
+
+def decode_text(data: bytes) -> str:
+    """Decode UTF-8 bytes with universal newlines (as Path.read_text(encoding='utf-8') does)."""
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _conn() -> Optional[sqlite3.Connection]:
+    if not settings.PARSE_CACHE_ENABLED:
+        return None
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        path = Path(settings.PARSE_CACHE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache ("
+            " kind TEXT NOT NULL, sha TEXT NOT NULL, version INTEGER NOT NULL,"
+            " result TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (kind, sha))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_parse_cache_last_used ON parse_cache (last_used)")
+        _local.conn = conn
+    return conn
+
+
+def get(kind: str, sha: str, version: int) -> Optional[dict]:
+    """Return the cached result for (kind, sha) produced by `version`, or None."""
+    try:
+        conn = _conn()
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT version, result, last_used FROM parse_cache WHERE kind = ? AND sha = ?", (kind, sha)
+        ).fetchone()
+        if row is None or row[0] != version:
+            return None
+        now = time.time()
+        if now - row[2] > _TOUCH_INTERVAL:
+            conn.execute("UPDATE parse_cache SET last_used = ? WHERE kind = ? AND sha = ?", (now, kind, sha))
+        return json.loads(row[1])
+    except Exception as e:
+        # the cache is an optimisation only: never fail the caller because of it
+        logger.warning("parse cache read failed: %s", e)
+        return None
+
+
+def put(kind: str, sha: str, version: int, result: dict) -> None:
+    """Store a parser result, evicting least-recently-used entries when over budget."""
+    global _puts_since_check
+    try:
+        conn = _conn()
+        if conn is None:
+            return
+        payload = json.dumps(result)
+        conn.execute(
+            "INSERT OR REPLACE INTO parse_cache (kind, sha, version, result, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, sha, version, payload, len(payload), time.time()),
+        )
+        with _puts_lock:
+            _puts_since_check += 1
+            check = _puts_since_check >= _EVICT_CHECK_EVERY
+            if check:
+                _puts_since_check = 0
+        if check:
+            evict()
+    except Exception as e:
+        logger.warning("parse cache write failed: %s", e)
+
+
+def evict(max_bytes: Optional[int] = None) -> int:
+    """Drop least-recently-used entries until the cache is under ~90% of its budget.
+
+    Returns the number of evicted entries.
+    """
+    conn = _conn()
+    if conn is None:
+        return 0
+    max_bytes = settings.PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+    target = int(max_bytes * 0.9)
+    evicted = 0
+    for kind, sha, size in conn.execute("SELECT kind, sha, size FROM parse_cache ORDER BY last_used").fetchall():
+        if total <= target:
+            break
+        conn.execute("DELETE FROM parse_cache WHERE kind = ? AND sha = ?", (kind, sha))
+        total -= size
+        evicted += 1
+    return evicted
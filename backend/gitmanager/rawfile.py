@@ -0,0 +1,168 @@
+"""Raw file responses: chunked streaming, single byte ranges, gzip and strong ETags.
+
+Working-tree files get an ETag from their (mtime_ns, size, inode), git blobs from
+their SHA. Clients revalidate with If-None-Match (304) and resume or page with
+Range: bytes=start-end (206, or 416 when unsatisfiable). Responses are
+gzip-compressed when the client accepts it, except for range requests, which
+are always served from the identity encoding. Bodies are read on the "fs" pool.
+"""
+import mimetypes
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from backend.gitmanager import executors
+
+CHUNK_SIZE = 64 * 1024
+# smaller bodies are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _media_type(name: str, head: bytes) -> str:
+    media_type, _ = mimetypes.guess_type(name)
+    if media_type is None:
+        try:
+            head.decode('utf-8')
+            media_type = 'text/plain'
+        except UnicodeDecodeError as e:
+            # a multi-byte character cut at the end of the sample is still text
+            media_type = 'text/plain' if e.start >= len(head) - 3 else 'application/octet-stream'
+    if media_type.startswith('text/'):
+        media_type += '; charset=utf-8'
+    return media_type
+
+
+def _matched_etag(header: Optional[str], etag: str, gzip_ok: bool) -> Optional[str]:
+    """Return the ETag of the variant that If-None-Match revalidates, or None.
+
+    The gzip variant carries its own tag; either revalidates the resource, and the 304
+    must echo the tag of the matched variant so caches keep that representation.
+    """
+    if not header:
+        return None
+    if header.strip() == '*':
+        return _gzip_etag(etag) if gzip_ok else etag
+    tags = {t.strip() for t in header.split(',')}
+    for tag in ((_gzip_etag(etag), etag) if gzip_ok else (etag, _gzip_etag(etag))):
+        if tag in tags:
+            return tag
+    return None
+
+
+def _gzip_etag(etag: str) -> str:
+    return etag[:-1] + '-gz"'
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Return (start, end) inclusive for a single 'bytes=' range, None to send the whole body.
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        # multiple ranges or other units: ignoring Range is allowed
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else size - 1
+    else:
+        # suffix range: the last N bytes
+        start = max(0, size - int(m.group(2)))
+        end = size - 1
+    if start >= size or end < start:
+        raise ValueError('unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _file_etag(st: os.stat_result) -> str:
+    return '"%x-%x-%x"' % (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _file_chunks(file_path: Path, etag: str, start: int, length: int):
+    # opened only once streaming starts: a response dropped before that holds no handle
+    with open(file_path, 'rb') as f:
+        if _file_etag(os.fstat(f.fileno())) != etag:
+            # replaced (or swapped) since the headers were built: abort rather than serve another file
+            raise OSError(f'{file_path} changed while being served')
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _bytes_chunks(data: bytes, start: int, length: int):
+    view = memoryview(data)[start:start + length]
+    for i in range(0, len(view), CHUNK_SIZE):
+        yield bytes(view[i:i + CHUNK_SIZE])
+
+
+def _stream(body, **kwargs) -> StreamingResponse:
+    return StreamingResponse(executors.iterate("fs", body), **kwargs)
+
+
+def _respond(request: Request, etag: str, size: int, name: str, head: bytes, chunks):
+    """Build the response for a resource; `chunks(start, length)` yields its bytes."""
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    gzip_ok = size >= GZIP_MIN_SIZE and 'gzip' in request.headers.get('accept-encoding', '').lower()
+    matched = _matched_etag(request.headers.get('if-none-match'), etag, gzip_ok)
+    if matched:
+        return Response(status_code=304, headers={**headers, "ETag": matched})
+    media_type = _media_type(name, head)
+
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    if range_header and if_range and if_range.strip() != etag:
+        # the client's copy is stale: send the whole current body
+        range_header = None
+    try:
+        byte_range = _parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        headers.update({"Content-Range": f"bytes {start}-{end}/{size}", "Content-Length": str(length)})
+        return _stream(chunks(start, length), status_code=206, media_type=media_type, headers=headers)
+
+    if gzip_ok:
+        headers.update({"ETag": _gzip_etag(etag), "Content-Encoding": "gzip"})
+        return _stream(_gzip_chunks(chunks(0, size)), media_type=media_type, headers=headers)
+    headers["Content-Length"] = str(size)
+    return _stream(chunks(0, size), media_type=media_type, headers=headers)
+
+
+def file_response(request: Request, file_path: Path):
+    """Stream a file from disk. The caller has already checked that the path may be served."""
+    with open(file_path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        head = f.read(512)
+    etag = _file_etag(st)
+    return _respond(request, etag, st.st_size, file_path.name, head,
+                    lambda start, length: _file_chunks(file_path, etag, start, length))
+
+
+def blob_response(request: Request, sha: str, data: bytes, name: str):
+    """Serve a git blob already read into memory; its SHA is the ETag."""
+    return _respond(request, '"%s"' % sha, len(data), name, data[:512],
+                    lambda start, length: _bytes_chunks(data, start, length))
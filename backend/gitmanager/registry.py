@@ -0,0 +1,96 @@
+"""Registry of the repositories under REPOS_BASE_PATH, with their resolved real paths.
+
+Filesystem endpoints look repos up here instead of resolving `REPOS_BASE_PATH / repo`
+and checking it on every request. The registry is rebuilt when the base directory
+changes (its mtime moves whenever a repo directory is added, removed or renamed),
+which costs a single stat per lookup, and can be refreshed explicitly after a clone.
+
+`resolve` is the containment check used by every endpoint: the requested path is
+resolved with os.path.realpath (so symlinks pointing outside the repo are caught)
+and compared to the repo's cached real path as a string prefix.
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+
+class RepoNotFound(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_repos: Dict[str, str] = {}
+_base_key: Optional[Tuple] = None
+
+
+def _scan(base: str) -> Dict[str, str]:
+    repos = {}
+    try:
+        with os.scandir(base) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        repos[entry.name] = os.path.realpath(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return repos
+
+
+def _current() -> Dict[str, str]:
+    global _repos, _base_key
+    base = settings.REPOS_BASE_PATH
+    try:
+        st = os.stat(base)
+        key = (base, st.st_ino, st.st_mtime_ns)
+    except OSError:
+        key = (base, None, None)
+    if key != _base_key:
+        with _lock:
+            if key != _base_key:
+                _repos = _scan(base) if key[1] is not None else {}
+                _base_key = key
+    return _repos
+
+
+def refresh():
+    """Forget the cached repos; the next lookup rescans REPOS_BASE_PATH."""
+    global _base_key
+    with _lock:
+        _base_key = None
+
+
+def names() -> List[str]:
+    """Sorted names of the repo directories."""
+    return sorted(_current())
+
+
+def repo_root(name: str) -> str:
+    """Return the real path of repo `name`, or raise RepoNotFound."""
+    root = _current().get(name)
+    if root is None:
+        # a repo created within the base directory's mtime granularity: check it directly
+        candidate = os.path.join(settings.REPOS_BASE_PATH, name)
+        if name in ('', '.', '..') or os.sep in name or (os.altsep and os.altsep in name) or not os.path.isdir(candidate):
+            raise RepoNotFound(name)
+        refresh()
+        root = _current().get(name)
+        if root is None:
+            raise RepoNotFound(name)
+    return root
+
+
+def within(root: str, real: str) -> bool:
+    """True if the real path `real` is `root` or lies below it."""
+    return real == root or real.startswith(root if root.endswith(os.sep) else root + os.sep)
+
+
+def resolve(root: str, rel: str) -> str:
+    """Resolve `rel` inside the repo at `root` (a real path); raise PermissionError if it escapes."""
+    real = os.path.realpath(os.path.join(root, rel))
+    if not within(root, real):
+        raise PermissionError(rel)
+    return real
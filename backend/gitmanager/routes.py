@@ -1,18 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import text
+from sqlalchemy import text, func
 from backend.db.session import SessionLocal
-from backend.gitmanager.service import clone_or_pull
-from backend.db.models import Repo, Script, User
+from backend.gitmanager import jobs
+from backend.gitmanager import scheduler
+from backend.gitmanager import parsecache
+from backend.gitmanager import gitread
+from backend.gitmanager import metadata
+from backend.gitmanager import metacache
+from backend.gitmanager import searchindex
+from backend.gitmanager import rawfile
+from backend.gitmanager import executors
+from backend.gitmanager import registry
+from backend.gitmanager import treesnap
+from backend.gitmanager import depgraph
+from backend.gitmanager.service import script_rel_dir, changed_paths
+from backend.db.models import Repo, Script, ScriptFunction, User, SyncRun
 from backend.db import t_models as tmodels
 from pathlib import Path
 import os
+import subprocess
 from backend.core.config import settings
 from backend.core.security import get_username_from_token
 from fastapi import Query
+from fastapi.responses import StreamingResponse
 from jose import jwt, JWTError
 import re
 import json
+import base64
+import posixpath
+import fnmatch
+import anyio
+import hashlib
+import stat
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from git import Repo as GitRepo, GitCommandError
@@ -36,6 +56,42 @@ def _is_hidden(path: Path, repo_dir: Path) -> bool:
     return False
 
 
+def _fs_repo_dir(repo: str) -> Path:
+    """Return the real path of a repo under REPOS_BASE_PATH (from the registry) or 404."""
+    try:
+        return Path(registry.repo_root(repo))
+    except registry.RepoNotFound:
+        raise HTTPException(status_code=404, detail="Repo not found on disk")
+
+
+def _fs_target(repo_dir: Path, path: str) -> Path:
+    """Resolve `path` inside `repo_dir`, following symlinks; 403 if it ends up outside the repo."""
+    try:
+        return Path(registry.resolve(str(repo_dir), path))
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+
+def _git_read(fn, *args):
+    """Call a `gitread` function, mapping its errors to HTTP errors."""
+    try:
+        return fn(*args)
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Access denied")
+    except gitread.RefNotFound:
+        raise HTTPException(status_code=404, detail="Ref not found")
+    except gitread.PathNotFound:
+        raise HTTPException(status_code=404, detail="Path not found")
+    except gitread.NotADirectory:
+        raise HTTPException(status_code=400, detail="Path is not a directory")
+    except gitread.NotAFile:
+        raise HTTPException(status_code=404, detail="File not found")
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Git read timed out")
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Git error: {e}")
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -44,15 +100,117 @@ def get_db():
         db.close()
 
 
+# accepted values for the partial clone filter (git --filter=<spec>)
+_CLONE_FILTER_RE = re.compile(r'^(blob:none|blob:limit=\d+[kmg]?|tree:\d+)$')
+
+
+def _valid_branch(branch: str) -> bool:
+    """True if `branch` is a valid branch name that git cannot mistake for an option."""
+    if not branch or branch.startswith('-'):
+        return False
+    try:
+        result = subprocess.run(['git', 'check-ref-format', '--branch', branch],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
 @router.post("/sync")
-def sync_repo(name: str, url: str, branch: str = "main", db: Session = Depends(get_db)):
-    repo, scripts = clone_or_pull(db, name, url, branch)
+@executors.offload("git")
+def sync_repo(
+    name: str,
+    url: str,
+    branch: str = "main",
+    full_rescan: bool = False,
+    fetch: bool = False,
+    depth: Optional[int] = Query(None, ge=0),
+    filter: Optional[str] = None,
+    sparse_paths: Optional[List[str]] = Query(None),
+):
+    """Enqueue a clone/update + index job for a repo and return its job id right away.
+
+    By default only files changed since the last indexed commit are re-parsed;
+    pass `full_rescan=true` to re-index the whole tree. If a sync of the same repo with
+    the same parameters is already queued or running, that job is returned (`attached: true`);
+    if its parameters differ, 409 with the active job id.
+    Poll GET /sync/{job_id} for progress.
+
+    Clone options are stored on the repo and reused by later syncs:
+    - depth: shallow history depth (0 clears it)
+    - filter: partial clone filter such as `blob:none` (empty string clears it)
+    - sparse_paths: directories to check out (repeat the parameter; pass an empty value to clear)
+    - fetch: fetch the branch from origin (with the same options) before indexing
+    """
+    if filter and not _CLONE_FILTER_RE.match(filter):
+        raise HTTPException(status_code=400, detail=f"Invalid clone filter '{filter}'")
+    if not _valid_branch(branch):
+        raise HTTPException(status_code=400, detail=f"Invalid branch '{branch}'")
+    if url.startswith('-'):
+        raise HTTPException(status_code=400, detail="Invalid repo url")
+    if sparse_paths and any(p.strip('/').startswith('-') for p in sparse_paths if p):
+        raise HTTPException(status_code=400, detail="Sparse paths must not start with '-'")
+    clone_options = {}
+    if depth is not None:
+        clone_options["depth"] = depth
+    if filter is not None:
+        clone_options["filter"] = filter
+    if sparse_paths is not None:
+        clone_options["sparse_paths"] = sparse_paths
+    try:
+        job, attached = jobs.submit_sync(name, url, branch, full_rescan=full_rescan, fetch=fetch,
+                                         clone_options=clone_options)
+    except jobs.SyncConflict as e:
+        raise HTTPException(status_code=409, detail={"msg": str(e), "job_id": e.job.id})
     return {
-        "msg": f"Repo '{repo.name}' sincronizzata in {repo.local_path}",
-        "scripts_count": len(scripts)
+        "msg": f"Sync della repo '{name}' in coda",
+        "job_id": job.id,
+        "status": job.status,
+        "attached": attached
     }
 
 
+@router.get("/sync/{job_id}")
+def sync_status(job_id: str):
+    """Return phase, files scanned/total, elapsed time, errors and (when done) the result of a sync job."""
+    job = jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job.to_dict()
+
+
+@router.post("/fleet-fetch")
+@executors.offload("git")
+def trigger_fleet_fetch():
+    """Run a fleet-wide fetch check now (in the background); returns its run id immediately.
+
+    409 with the id of the active run if a run (manual or periodic) is already in progress.
+    """
+    run_id, started = scheduler.trigger()
+    if not started:
+        raise HTTPException(status_code=409, detail={"msg": "Fleet fetch già in corso", "run_id": run_id})
+    return {"msg": "Fleet fetch avviato", "run_id": run_id}
+
+
+@router.get("/fleet-fetch/runs")
+def list_fleet_fetch_runs(repo_id: Optional[int] = None, limit: int = Query(100, ge=1, le=1000), db: Session = Depends(get_db)):
+    """Return the most recent per-repo fleet fetch records (timings and outcome), newest first."""
+    q = db.query(SyncRun)
+    if repo_id:
+        q = q.filter(SyncRun.repo_id == repo_id)
+    rows = q.order_by(SyncRun.id.desc()).limit(limit).all()
+    return [{
+        "run_id": r.run_id,
+        "repo_id": r.repo_id,
+        "started_at": r.started_at,
+        "check_ms": r.check_ms,
+        "sync_ms": r.sync_ms,
+        "outcome": r.outcome,
+        "remote_commit": r.remote_commit,
+        "detail": r.detail
+    } for r in rows]
+
+
 @router.get("/repos")
 def list_repos(db: Session = Depends(get_db)):
     return db.query(Repo).all()
@@ -60,72 +218,133 @@ def list_repos(db: Session = Depends(get_db)):
 
 @router.get("/dirs")
 def list_dirs(repo_id: int, db: Session = Depends(get_db)):
-    """Return a sorted list of relative directories present in the repo (derived from scripts paths)."""
+    """Return a sorted list of relative directories present in the repo (derived from scripts paths).
+
+    Reads the indexed `rel_dir` column; rows indexed before it existed (NULL) are
+    derived from their paths until the next sync or backfill fills them in.
+    """
     repo = db.query(Repo).filter(Repo.id == repo_id).first()
     if not repo:
         raise HTTPException(status_code=404, detail="Repo not found")
 
-    base = Path(repo.local_path)
-    dirs = set()
-    scripts = db.query(Script).filter(Script.repo_id == repo_id).all()
-    for s in scripts:
-        try:
-            rel = os.path.relpath(s.path, str(base))
-        except Exception:
-            # fallback to using full path
-            rel = s.path
-        dirname = os.path.dirname(rel)
-        # normalize root to empty string
-        if dirname == "":
-            dirs.add(".")
-        else:
-            dirs.add(dirname)
+    dirs = {d for (d,) in db.query(Script.rel_dir).filter(Script.repo_id == repo_id).distinct()}
+    if None in dirs:
+        dirs.discard(None)
+        legacy = db.query(Script.path).filter(Script.repo_id == repo_id, Script.rel_dir.is_(None))
+        dirs.update(script_rel_dir(p, repo.local_path) for (p,) in legacy)
+
+    return sorted(dirs)
+
+
+@router.get("/search")
+def search_scripts(
+    q: str = Query(..., min_length=1, max_length=500),
+    repo_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    """Full-text search over scripts (filename, path, description, topology, author,
+    function names and docstrings, and content when SEARCH_INDEX_CONTENT is enabled).
+
+    Every word of `q` must match (the last one as a prefix). Results are ranked by
+    relevance; `highlights` wraps matched terms in <mark> and `snippet` is the best
+    matching excerpt across all indexed fields. Both are HTML-escaped apart from the
+    <mark> tags, so they can be inserted as HTML as they are.
+    """
+    if not settings.SEARCH_INDEX_ENABLED:
+        raise HTTPException(status_code=503, detail="Search index disabled")
+    try:
+        results = searchindex.search(q, repo_id=repo_id, limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {e}")
+    return {"query": q, "results": results}
+
+
+# /scripts fields: returned by default, and heavy columns only sent when asked for
+_SCRIPT_LIST_DEFAULT_FIELDS = ("id", "path", "filename", "description", "topology", "author")
+_SCRIPT_LIST_FIELDS = _SCRIPT_LIST_DEFAULT_FIELDS + (
+    "repo_id", "rel_path", "rel_dir", "last_commit", "module_doc", "functions_doc")
+
+
+def _encode_scripts_cursor(repo_id: int, rel_path: str) -> str:
+    raw = json.dumps([repo_id, rel_path]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
 
-    return sorted(list(dirs))
+def _decode_scripts_cursor(cursor: str):
+    try:
+        repo_id, rel_path = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(rel_path, str):
+            raise ValueError(rel_path)
+        return int(repo_id), rel_path
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 
 @router.get("/scripts")
-def list_scripts(repo_id: int = None, dir: str = None, db: Session = Depends(get_db)):
-    q = db.query(Script)
+def list_scripts(
+    response: Response,
+    repo_id: int = None,
+    dir: str = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """List indexed scripts, ordered by (repo_id, repo-relative path), one page at a time.
+
+    Parameters:
+    - repo_id: only scripts of this repo
+    - dir: only scripts below this repo-relative directory ('.' = whole repo; needs repo_id)
+    - fields: comma-separated columns to return (default id, path, filename, description,
+      topology, author); `module_doc`, `functions_doc` (JSON string), `repo_id`, `rel_path`,
+      `rel_dir` and `last_commit` are only sent when listed
+    - limit / cursor: page size (default SCRIPTS_PAGE_SIZE, capped at SCRIPTS_MAX_PAGE_SIZE);
+      when more rows remain the X-Next-Cursor response header holds the cursor for the next page
+
+    Rows without `rel_path` (not backfilled yet, see migrate_add_script_rel_path.py) are not listed.
+    """
+    if fields:
+        wanted = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in wanted if f not in _SCRIPT_LIST_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        wanted = list(_SCRIPT_LIST_DEFAULT_FIELDS)
+    limit = min(limit or settings.SCRIPTS_PAGE_SIZE, settings.SCRIPTS_MAX_PAGE_SIZE)
+
+    # repo_id and rel_path are always read: they make up the cursor
+    columns = [Script.repo_id, Script.rel_path] + [getattr(Script, f) for f in wanted if f not in ("repo_id", "rel_path")]
+    # a NULL rel_path cannot be ordered against the cursor
+    q = db.query(*columns).filter(Script.rel_path.isnot(None))
     if repo_id:
         q = q.filter(Script.repo_id == repo_id)
 
     if dir is not None:
         if not repo_id:
             raise HTTPException(status_code=400, detail="repo_id is required when filtering by dir")
-        repo = db.query(Repo).filter(Repo.id == repo_id).first()
+        repo = db.query(Repo.id).filter(Repo.id == repo_id).first()
         if not repo:
             raise HTTPException(status_code=404, detail="Repo not found")
-        # compute absolute prefix for the directory
-        base = Path(repo.local_path)
         # interpret '.' as root
-        if dir == '.' or dir == '':
-            prefix = str(base)
-        else:
-            prefix = str(base / dir)
-        # ensure prefix uses forward/back slashes consistently
-        prefix = os.path.normpath(prefix)
-        # filter by path starting with prefix
-        q = q.filter(Script.path.like(f"{prefix}%"))
-
-    scripts = q.all()
-    result = []
-    for s in scripts:
-        result.append({
-            "id": s.id,
-            "path": s.path,
-            "filename": s.filename,
-            "description": s.description,
-            "topology": s.topology,
-            "author": s.author,
-            "functions_doc": s.functions_doc
-        })
-    return result
+        prefix = posixpath.normpath(dir.replace('\\', '/')).strip('/')
+        if prefix not in ('.', ''):
+            # rel_path starts with 'prefix/': a range on the (repo_id, rel_path) index
+            q = q.filter(Script.rel_path >= prefix + '/', Script.rel_path < prefix + '0')
 
+    if cursor:
+        after_repo, after_path = _decode_scripts_cursor(cursor)
+        q = q.filter((Script.repo_id > after_repo) | ((Script.repo_id == after_repo) & (Script.rel_path > after_path)))
 
-@router.get("/scripts/{script_id}/content")
-def get_script_content(script_id: int, db: Session = Depends(get_db)):
-    """Return the raw content of a script file by id (safe: ensure file is inside repo local_path)."""
+    rows = q.order_by(Script.repo_id, Script.rel_path).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_scripts_cursor(rows[-1].repo_id, rows[-1].rel_path)
+    return [{f: getattr(row, f) for f in wanted} for row in rows]
+
+
+def _script_file(db: Session, script_id: int):
+    """Return (Script, resolved file path) for a script id, checking the file lies inside its repo."""
     s = db.query(Script).filter(Script.id == script_id).first()
     if not s:
         raise HTTPException(status_code=404, detail="Script not found")
@@ -134,21 +353,24 @@ def get_script_content(script_id: int, db: Session = Depends(get_db)):
     if not repo:
         raise HTTPException(status_code=404, detail="Repo for script not found")
 
-    file_path = Path(s.path).resolve()
-    repo_base = Path(repo.local_path).resolve()
     try:
-        # ensure file is under repo_base
-        if not file_path.exists() or not file_path.is_file():
-            raise HTTPException(status_code=404, detail="File not found on disk")
-        # Py3.9+: is_relative_to
-        if not file_path.is_relative_to(repo_base):
-            raise HTTPException(status_code=403, detail="Access denied")
-    except AttributeError:
-        # fallback for older versions: compare parents
-        try:
-            file_path.relative_to(repo_base)
-        except Exception:
-            raise HTTPException(status_code=403, detail="Access denied")
+        repo_base = registry.repo_root(repo.name)
+    except registry.RepoNotFound:
+        repo_base = os.path.realpath(repo.local_path)
+    file_path = os.path.realpath(s.path)
+    # ensure file is under repo_base
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="File not found on disk")
+    if not registry.within(repo_base, file_path):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return s, Path(file_path)
+
+
+@router.get("/scripts/{script_id}/content")
+@executors.offload("fs")
+def get_script_content(script_id: int, db: Session = Depends(get_db)):
+    """Return the raw content of a script file by id (safe: ensure file is inside repo local_path)."""
+    s, file_path = _script_file(db, script_id)
 
     try:
         content = file_path.read_text(encoding="utf-8")
@@ -158,67 +380,215 @@ def get_script_content(script_id: int, db: Session = Depends(get_db)):
     return {"id": s.id, "path": s.path, "content": content}
 
 
+@router.get("/scripts/{script_id}/raw")
+@executors.offload("fs")
+def get_script_raw(script_id: int, request: Request, db: Session = Depends(get_db)):
+    """Stream a script file as-is (Range, gzip, ETag / If-None-Match; see rawfile)."""
+    _s, file_path = _script_file(db, script_id)
+    try:
+        return rawfile.file_response(request, file_path)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
+
+
+def _function_record(f: ScriptFunction, s: Script = None) -> dict:
+    record = {"script_id": f.script_id, "repo_id": f.repo_id, "name": f.name, "lineno": f.lineno,
+              "signature": f.signature, "docstring": f.docstring}
+    if s is not None:
+        record.update({"path": s.path, "rel_path": s.rel_path, "filename": s.filename})
+    return record
+
+
+@router.get("/functions")
+def find_functions(
+    name: str = Query(..., min_length=1, max_length=255),
+    prefix: bool = False,
+    repo_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Return the scripts defining a function `name` (or, with prefix=true, a name starting with it).
+
+    Each record carries the function's line number, signature and docstring and the
+    script's id, path and rel_path; ordered by name, repo and path.
+    """
+    q = db.query(ScriptFunction, Script).join(Script, Script.id == ScriptFunction.script_id)
+    if prefix:
+        # a range on the name index: every string starting with `name` sorts in [name, name + U+FFFF)
+        q = q.filter(ScriptFunction.name >= name, ScriptFunction.name < name + '\uffff')
+    else:
+        q = q.filter(ScriptFunction.name == name)
+    if repo_id:
+        q = q.filter(ScriptFunction.repo_id == repo_id)
+    rows = q.order_by(ScriptFunction.name, ScriptFunction.repo_id, Script.rel_path, ScriptFunction.lineno) \
+        .offset(offset).limit(limit).all()
+    return [_function_record(f, s) for f, s in rows]
+
+
+@router.get("/functions/counts")
+def count_functions(repo_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Return per repo the number of indexed functions and of scripts defining at least one."""
+    q = db.query(ScriptFunction.repo_id, func.count(ScriptFunction.id), func.count(func.distinct(ScriptFunction.script_id)))
+    if repo_id:
+        q = q.filter(ScriptFunction.repo_id == repo_id)
+    rows = q.group_by(ScriptFunction.repo_id).order_by(ScriptFunction.repo_id).all()
+    return [{"repo_id": r, "functions": n, "scripts": scripts} for r, n, scripts in rows]
+
+
+@router.get("/scripts/{script_id}/functions")
+def list_script_functions(script_id: int, db: Session = Depends(get_db)):
+    """Return the top-level functions of a script in source order."""
+    if not db.query(Script.id).filter(Script.id == script_id).first():
+        raise HTTPException(status_code=404, detail="Script not found")
+    rows = db.query(ScriptFunction).filter(ScriptFunction.script_id == script_id) \
+        .order_by(ScriptFunction.lineno).all()
+    return [_function_record(f) for f in rows]
+
+
 # Filesystem-based endpoints (do not depend on DB):
 @router.get("/fs/repos")
+@executors.offload("fs")
 def fs_list_repos():
     """List repository directories under the configured REPOS_BASE_PATH."""
-    base = Path(settings.REPOS_BASE_PATH)
-    if not base.exists():
-        return []
-    repos = [p.name for p in sorted(base.iterdir()) if p.is_dir()]
-    return repos
+    return registry.names()
+
+
+def _list_sort_key(sort: str):
+    if sort == 'dirs_first':
+        return lambda e: (not e["is_dir"], e["name"])
+    return lambda e: e["name"]
+
+
+def _page_entries(entries: list, sort: str, order: str, cursor: Optional[str], limit: Optional[int]):
+    """Sort listing entries and return (page, next_cursor).
+
+    The cursor is the last entry of the previous page as '<d|f>/<name>' (names cannot
+    contain '/'), so pages stay consistent when entries are added or removed meanwhile.
+    """
+    key = _list_sort_key(sort)
+    reverse = order == 'desc'
+    entries.sort(key=key, reverse=reverse)
+    if cursor:
+        kind, _, name = cursor.partition('/')
+        if kind not in ('d', 'f') or not name:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        last = key({"name": name, "is_dir": kind == 'd'})
+        entries = [e for e in entries if (key(e) < last if reverse else key(e) > last)]
+    if limit is None or len(entries) <= limit:
+        return entries, None
+    page = entries[:limit]
+    return page, ('d/' if page[-1]["is_dir"] else 'f/') + page[-1]["name"]
 
 
 @router.get("/fs/list")
-def fs_list(repo: str, path: str = '.'):
+@executors.offload("fs")
+def fs_list(
+    repo: str,
+    request: Request,
+    response: Response,
+    path: str = '.',
+    ref: Optional[str] = None,
+    sort: str = Query('name', pattern='^(name|dirs_first)$'),
+    order: str = Query('asc', pattern='^(asc|desc)$'),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cursor: Optional[str] = None,
+):
     """List files and directories for a repo at a given relative path.
 
     Parameters:
     - repo: repository directory name under REPOS_BASE_PATH
     - path: relative path inside the repo (default '.')
+    - ref: optional branch/tag/commit; when set the listing is read from the git
+      object database at that ref instead of the checked-out working tree
+    - sort / order: 'name' (default) or 'dirs_first', 'asc' or 'desc'
+    - limit / cursor: page size; when more entries remain the X-Next-Cursor response
+      header holds the cursor for the next page (without `limit` all entries are returned)
+
+    Working-tree listings carry an ETag derived from the directory mtime; a request
+    with a matching If-None-Match gets 304 Not Modified.
     """
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
-    if not repo_dir.exists() or not repo_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Repo not found on disk")
+    repo_dir = _fs_repo_dir(repo)
 
-    target = (repo_dir / path).resolve()
-    # ensure target is inside repo_dir
-    try:
-        target.relative_to(repo_dir)
-    except Exception:
-        raise HTTPException(status_code=403, detail="Access denied")
+    if ref:
+        entries = []
+        for name, rel, is_dir in _git_read(gitread.list_dir, repo_dir, ref, path):
+            # same filtering as the working-tree listing: hidden segments and suites folders
+            if any(part.startswith('.') for part in rel.split('/')):
+                continue
+            if is_dir and name == settings.SUITES_FOLDER:
+                continue
+            entries.append({"name": name, "path": rel, "is_dir": is_dir})
+        page, next_cursor = _page_entries(entries, sort, order, cursor, limit)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return page
 
-    if not target.exists():
+    # ensure target is inside repo_dir (symlinks included)
+    target = _fs_target(repo_dir, path)
+
+    try:
+        st = target.stat()
+    except OSError:
         raise HTTPException(status_code=404, detail="Path not found")
+    if not stat.S_ISDIR(st.st_mode):
+        raise HTTPException(status_code=400, detail="Path is not a directory")
+
+    # the directory mtime changes whenever an entry is added, removed or renamed
+    tag = f"{st.st_ino}:{st.st_mtime_ns}:{settings.SUITES_FOLDER}:{sort}:{order}:{limit}:{cursor}"
+    etag = '"' + hashlib.sha1(tag.encode('utf-8')).hexdigest()[:20] + '"'
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
 
     entries = []
-    if target.is_dir():
-        for child in sorted(target.iterdir()):
-            # skip hidden files/dirs (any path segment starting with '.')
-            if _is_hidden(child, repo_dir):
-                continue
-            # hide repository-internal 'suites' directories from filesystem listings
-            if child.is_dir() and child.name == settings.SUITES_FOLDER:
-                continue
-            entries.append({
-                "name": child.name,
-                "path": str(child.relative_to(repo_dir)),
-                "is_dir": child.is_dir()
-            })
-    else:
-        raise HTTPException(status_code=400, detail="Path is not a directory")
+    # hidden directories above `target` hide everything below them
+    if not _is_hidden(target, repo_dir):
+        rel_dir = target.relative_to(repo_dir)
+        with os.scandir(target) as it:
+            for entry in it:
+                # skip hidden files/dirs
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                # hide repository-internal 'suites' directories from filesystem listings
+                if is_dir and entry.name == settings.SUITES_FOLDER:
+                    continue
+                entries.append({"name": entry.name, "path": str(rel_dir / entry.name), "is_dir": is_dir})
+
+    page, next_cursor = _page_entries(entries, sort, order, cursor, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+
+@router.get("/fs/tree")
+@executors.offload("fs")
+def fs_tree(repo: str, since: Optional[int] = Query(None, ge=0), epoch: Optional[str] = None):
+    """Return the whole visible tree of a repo, or only what changed since a generation.
+
+    Without `since` the response is a full snapshot:
+      {"repo", "epoch", "generation", "full": true, "dirs": [...], "entries": [[dir, name, is_dir, size, mtime_ms], ...]}
+    where `dir` indexes the `dirs` table of parent paths ('' is the repo root).
+    With `since` (and the `epoch` of the response it came from) only the differences are returned:
+      {"repo", "epoch", "generation", "full": false, "since", "dirs", "added", "changed", "removed"}
+    with `removed` entries encoded as [dir, name]. When `since` is too old or the epoch
+    differs (e.g. the server restarted) a full snapshot is returned instead.
+    Hidden files and SUITES_FOLDER directories are excluded, as in /fs/list.
+    """
+    repo_dir = _fs_repo_dir(repo)
+    return treesnap.snapshot(repo, str(repo_dir), since=since, epoch=epoch)
 
-    return entries
 
 @router.get('/fs/config')
 def fs_get_config():
     """Return minimal filesystem config for frontend: configured SCRIPT_REPO_NAME and available repos."""
     configured = settings.SCRIPT_REPO_NAME
-    base = Path(settings.REPOS_BASE_PATH)
-    repos = []
-    if base.exists():
-        repos = [p.name for p in sorted(base.iterdir()) if p.is_dir()]
+    repos = registry.names()
     return { 'script_repo_name': configured, 'available_repos': repos }
 
 
@@ -859,6 +1229,7 @@ class CheckoutPayload(BaseModel):
 
 
 @router.post('/fs/checkout')
+@executors.offload("git")
 def fs_checkout(payload: CheckoutPayload):
     """Checkout the given branch in the configured script repo.
 
@@ -867,9 +1238,9 @@ def fs_checkout(payload: CheckoutPayload):
     repo_name = settings.SCRIPT_REPO_NAME
     if not repo_name:
         raise HTTPException(status_code=400, detail="No SCRIPT_REPO_NAME configured")
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo_name)
-    if not repo_dir.exists() or not repo_dir.is_dir():
+    try:
+        repo_dir = Path(registry.repo_root(repo_name))
+    except registry.RepoNotFound:
         raise HTTPException(status_code=404, detail="Configured repo not found on disk")
     try:
         grepo = GitRepo(str(repo_dir))
@@ -914,22 +1285,32 @@ def fs_checkout(payload: CheckoutPayload):
     return entries
 
 
+def _fs_file(repo_dir: Path, path: str) -> Path:
+    """Resolve a working-tree file, refusing paths that escape the repo."""
+    target = _fs_target(repo_dir, path)
+    if not target.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    return target
+
+
 @router.get("/fs/file")
-def fs_get_file(repo: str, path: str):
-    """Return the content of a file inside a repo (by repo name and relative path)."""
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
-    if not repo_dir.exists() or not repo_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Repo not found on disk")
+@executors.offload("fs")
+def fs_get_file(repo: str, path: str, ref: Optional[str] = None):
+    """Return the content of a file inside a repo (by repo name and relative path).
 
-    target = (repo_dir / path).resolve()
-    try:
-        target.relative_to(repo_dir)
-    except Exception:
-        raise HTTPException(status_code=403, detail="Access denied")
+    With `ref`, the file is read from the git object database at that branch/tag/commit.
+    """
+    repo_dir = _fs_repo_dir(repo)
 
-    if not target.exists() or not target.is_file():
-        raise HTTPException(status_code=404, detail="File not found")
+    if ref:
+        _sha, data = _git_read(gitread.read_file, repo_dir, ref, path)
+        try:
+            content = parsecache.decode_text(data)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
+        return {"path": gitread.normalize_path(path), "content": content}
+
+    target = _fs_file(repo_dir, path)
 
     try:
         content = target.read_text(encoding='utf-8')
@@ -939,203 +1320,331 @@ def fs_get_file(repo: str, path: str):
     return {"path": str(target.relative_to(repo_dir)), "content": content}
 
 
+@router.get("/fs/raw")
+@executors.offload("fs")
+def fs_get_raw(repo: str, path: str, request: Request, ref: Optional[str] = None):
+    """Stream a file inside a repo as-is instead of wrapping it in JSON.
+
+    Supports Range (single byte range), gzip (Accept-Encoding) and revalidation with
+    If-None-Match against a strong ETag (blob SHA with `ref`, else mtime/size/inode).
+    """
+    repo_dir = _fs_repo_dir(repo)
+
+    if ref:
+        sha, data = _git_read(gitread.read_file, repo_dir, ref, path)
+        return rawfile.blob_response(request, sha, data, gitread.normalize_path(path).rsplit('/', 1)[-1])
+
+    target = _fs_file(repo_dir, path)
+    try:
+        return rawfile.file_response(request, target)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
+
+
+class BatchPayload(BaseModel):
+    repo: str
+    paths: List[str] = Field(..., min_length=1)
+    ref: Optional[str] = None
+    # what to return per path: 'content' and/or 'meta'
+    include: List[str] = Field(default_factory=lambda: ['content', 'meta'])
+    # total content bytes for the whole response (capped by settings.BATCH_MAX_BYTES)
+    max_bytes: Optional[int] = Field(None, ge=1)
+
+
+def _batch_record(repo: str, repo_dir: Path, path: str, ref: Optional[str], include: set, budget: int):
+    """Build one /fs/batch record. Returns (record, content bytes used)."""
+    if ref:
+        sha, data = _git_read(gitread.read_file, repo_dir, ref, path)
+        record = {"path": gitread.normalize_path(path)}
+        if len(data) > budget and 'content' in include:
+            raise HTTPException(status_code=413, detail="Batch byte limit exceeded")
+        if 'meta' in include:
+            record["meta"] = _cached_blob_meta(sha, data)
+        used = 0
+        if 'content' in include:
+            record["content"] = parsecache.decode_text(data)
+            used = len(data)
+        return record, used
+
+    target = _fs_file(repo_dir, path)
+    rel = str(target.relative_to(repo_dir))
+    record = {"path": rel}
+    used = 0
+    if 'content' in include:
+        size = target.stat().st_size
+        if size > budget:
+            raise HTTPException(status_code=413, detail="Batch byte limit exceeded")
+        data = target.read_bytes()
+        record["content"] = parsecache.decode_text(data)
+        used = len(data)
+    if 'meta' in include:
+        record["meta"] = metacache.get_meta(repo, rel, target)
+    return record, used
+
+
+@router.post("/fs/batch")
+@executors.offload("fs")
+def fs_get_batch(payload: BatchPayload):
+    """Fetch content and/or metadata of many files of a repo in one streamed response.
+
+    The response is NDJSON with one record per requested path, in request order:
+    {"path", "content"?, "meta"?} on success or {"path", "error", "status"} when that
+    path failed (same status codes as /fs/file and /fs/meta). A file whose content would
+    push the total over `max_bytes` (at most BATCH_MAX_BYTES) fails with status 413.
+    The last record is {"done": true, "files", "errors", "bytes"}.
+    """
+    if len(payload.paths) > settings.BATCH_MAX_PATHS:
+        raise HTTPException(status_code=400, detail=f"Too many paths (max {settings.BATCH_MAX_PATHS})")
+    include = set(payload.include)
+    if not include or not include <= {'content', 'meta'}:
+        raise HTTPException(status_code=400, detail="include must list 'content' and/or 'meta'")
+    repo_dir = _fs_repo_dir(payload.repo)
+    max_bytes = min(payload.max_bytes or settings.BATCH_MAX_BYTES, settings.BATCH_MAX_BYTES)
+
+    def generate():
+        total = 0
+        errors = 0
+        for path in payload.paths:
+            try:
+                record, used = _batch_record(payload.repo, repo_dir, path, payload.ref, include, max_bytes - total)
+                total += used
+            except HTTPException as e:
+                record = {"path": path, "error": e.detail, "status": e.status_code}
+                errors += 1
+            except Exception as e:
+                record = {"path": path, "error": f"Could not read file: {e}", "status": 500}
+                errors += 1
+            yield json.dumps(record) + "\n"
+        yield json.dumps({"done": True, "files": len(payload.paths), "errors": errors, "bytes": total}) + "\n"
+
+    return StreamingResponse(executors.iterate("fs", generate()), media_type="application/x-ndjson")
+
+
+def _cached_blob_meta(sha: str, data: bytes) -> dict:
+    """Return the header metadata of a blob already read from git, using the parse cache."""
+    meta = parsecache.get("fs_meta", sha, metadata.VERSION)
+    if meta is None:
+        meta = metadata.blob_meta(data)
+        parsecache.put("fs_meta", sha, metadata.VERSION, meta)
+    return meta
+
+
+def _git_meta_dir(repo_dir: Path, ref: str, path: str) -> dict:
+    """fs_get_meta_dir for a git ref: blobs whose SHA is cached are not even read."""
+    files = [(rel, sha) for rel, sha in _git_read(gitread.list_files, repo_dir, ref, path)
+             if not any(part.startswith('.') for part in rel.split('/'))]
+    metas = {}
+    missing = []
+    for rel, sha in files:
+        meta = parsecache.get("fs_meta", sha, metadata.VERSION)
+        if meta is None:
+            missing.append((rel, sha))
+        else:
+            metas[rel] = {"path": rel, **meta}
+    if missing:
+        blobs = gitread.read_blobs(repo_dir, {sha for _rel, sha in missing})
+        for rel, sha in missing:
+            try:
+                meta = _cached_blob_meta(sha, blobs[sha])
+            except Exception:
+                metas[rel] = None
+                continue
+            metas[rel] = {"path": rel, **meta}
+    return {rel: metas[rel] for rel, _sha in files}
+
+
 @router.get("/fs/meta")
-def fs_get_meta(repo: str, path: str):
+@executors.offload("fs")
+def fs_get_meta(repo: str, path: str, ref: Optional[str] = None):
     """Extract simple metadata from the top-level docstring of a file.
 
     Returns JSON with optional keys: description, topology, author
+    With `ref`, the file is read from the git object database at that branch/tag/commit.
     """
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
-    if not repo_dir.exists() or not repo_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Repo not found on disk")
+    repo_dir = _fs_repo_dir(repo)
 
-    target = (repo_dir / path).resolve()
-    try:
-        target.relative_to(repo_dir)
-    except Exception:
-        raise HTTPException(status_code=403, detail="Access denied")
+    if ref:
+        sha, data = _git_read(gitread.read_file, repo_dir, ref, path)
+        try:
+            meta = _cached_blob_meta(sha, data)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
+        return {"path": gitread.normalize_path(path), **meta}
+
+    target = _fs_target(repo_dir, path)
 
     if not target.exists() or not target.is_file():
         raise HTTPException(status_code=404, detail="File not found")
 
+    rel = str(target.relative_to(repo_dir))
     try:
-        content = target.read_text(encoding='utf-8')
+        meta = metacache.get_meta(repo, rel, target)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not read file: {e}")
 
-    # find a top-level triple-quoted docstring (''' or """) near the start
-    # allow for shebang/encoding/license header before the docstring by searching
-    snippet = content[:4096]
-    m = re.search(r"(?P<quote>['\"]{3})(?P<doc>.*?)(?P=quote)", snippet, re.S)
-    doc = m.group('doc').strip() if m else ''
-
-    # fallback: if no triple-quoted docstring, consider an initial block of '#' comments
-    if not doc:
-        # collect consecutive leading comment lines (skip blank lines at very top)
-        comment_lines = []
-        for line in snippet.splitlines():
-            s = line.strip()
-            if not s:
-                # stop if we've already collected comment lines and hit a blank line
-                if comment_lines:
-                    break
-                else:
-                    continue
-            if s.startswith('#'):
-                # remove leading '#' and any one space
-                comment_lines.append(s.lstrip('#').strip())
-            else:
-                # stop at first non-comment non-blank line
-                break
-        if comment_lines:
-            doc = '\n'.join(comment_lines).strip()
-
-    description = None
-    topology = None
-    author = None
-    explicit_fields = {"description": False, "topology": False, "author": False}
-
-    if doc:
-        # search for explicit ':field Key: value' lines (case-insensitive), e.g. ':field Description: ...'
-        field_re = re.compile(r'(?i)^:field\s+(description|topology|author)\s*:\s*(.+)$')
-        for line in doc.splitlines():
-            line_stripped = line.strip()
-            if not line_stripped:
-                continue
-            mfield = field_re.match(line_stripped)
-            if mfield:
-                key = mfield.group(1).lower()
-                val = mfield.group(2).strip()
-                if key == 'description':
-                    description = val
-                    explicit_fields['description'] = True
-                    continue
-                if key == 'topology':
-                    topology = val
-                    explicit_fields['topology'] = True
-                    continue
-                if key == 'author':
-                    author = val
-                    explicit_fields['author'] = True
-                    continue
+    return {"path": rel, **meta}
 
-        # fallback: use first paragraph as description if not found
-        if not description:
-            paragraphs = [p.strip() for p in doc.split('\n\n') if p.strip()]
-            if paragraphs:
-                description = paragraphs[0].splitlines()[0].strip()
 
-    return {"path": str(target.relative_to(repo_dir)), "description": description, "topology": topology, "author": author, "explicit_fields": explicit_fields}
+@router.get("/fs/meta-dir")
+@executors.offload("fs")
+def fs_get_meta_dir(repo: str, path: str = '.', ref: Optional[str] = None):
+    """Return metadata for all files directly under the given directory (non-recursive).
 
+    With `ref`, files are read from the git object database at that branch/tag/commit.
+    """
+    repo_dir = _fs_repo_dir(repo)
 
-@router.get("/fs/meta-dir")
-def fs_get_meta_dir(repo: str, path: str = '.'):
-    """Return metadata for all files directly under the given directory (non-recursive)."""
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
-    if not repo_dir.exists() or not repo_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Repo not found on disk")
+    if ref:
+        return _git_meta_dir(repo_dir, ref, path)
 
-    target = (repo_dir / path).resolve()
-    try:
-        target.relative_to(repo_dir)
-    except Exception:
-        raise HTTPException(status_code=403, detail="Access denied")
+    target = _fs_target(repo_dir, path)
 
     if not target.exists() or not target.is_dir():
         raise HTTPException(status_code=404, detail="Path not found or not a directory")
 
+    # hidden directories above `target` hide everything below them
+    if _is_hidden(target, repo_dir):
+        return {}
+    rel_dir = target.relative_to(repo_dir)
+
+    # one scandir + one stat per entry; only files whose stat changed are re-parsed
     metas = {}
-    for child in sorted(target.iterdir()):
+    with os.scandir(target) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
         # skip hidden files/dirs
-        if _is_hidden(child, repo_dir):
+        if entry.name.startswith('.'):
             continue
-        if child.is_file():
-            try:
-                # reuse the logic by reading file and applying same parsing
-                content = child.read_text(encoding='utf-8')
-            except Exception:
-                metas[str(child.relative_to(repo_dir))] = None
+        rel = str(rel_dir / entry.name)
+        try:
+            if not entry.is_file() or not _entry_in_repo(entry, repo_dir):
                 continue
-
-            # mimic fs_get_meta parsing (docstring or leading comments)
-            snippet = content[:4096]
-            m = re.search(r"(?P<quote>['\"]{3})(?P<doc>.*?)(?P=quote)", snippet, re.S)
-            doc = m.group('doc').strip() if m else ''
-            if not doc:
-                comment_lines = []
-                for line in snippet.splitlines():
-                    s = line.strip()
-                    if not s:
-                        if comment_lines:
-                            break
-                        else:
-                            continue
-                    if s.startswith('#'):
-                        comment_lines.append(s.lstrip('#').strip())
-                    else:
-                        break
-                if comment_lines:
-                    doc = '\n'.join(comment_lines).strip()
-
-            description = None
-            topology = None
-            author = None
-            explicit_fields = {"description": False, "topology": False, "author": False}
-            if doc:
-                # first look for ':field Key: value' explicit patterns
-                field_re = re.compile(r'(?i)^:field\s+(description|topology|author)\s*:\s*(.+)$')
-                for line in doc.splitlines():
-                    line_stripped = line.strip()
-                    if not line_stripped:
-                        continue
-                    mfield = field_re.match(line_stripped)
-                    if mfield:
-                        k = mfield.group(1).lower()
-                        v = mfield.group(2).strip()
-                        if k == 'description':
-                            description = v
-                            explicit_fields['description'] = True
-                            continue
-                        if k == 'topology':
-                            topology = v
-                            explicit_fields['topology'] = True
-                            continue
-                        if k == 'author':
-                            author = v
-                            explicit_fields['author'] = True
-                            continue
-
-                # if explicit fields not present, fallback to 'Key: value' lines but do not mark them as explicit
-                if not (explicit_fields['description'] or explicit_fields['topology'] or explicit_fields['author']):
-                    for line in doc.splitlines():
-                        line_stripped = line.strip()
-                        if not line_stripped:
-                            continue
-                        kv = re.match(r'(?i)^(description)\s*:\s*(.+)$', line_stripped)
-                        if kv:
-                            description = kv.group(2).strip()
-                            continue
-                        kv = re.match(r'(?i)^(topology)\s*:\s*(.+)$', line_stripped)
-                        if kv:
-                            topology = kv.group(2).strip()
-                            continue
-                        kv = re.match(r'(?i)^(author)\s*:\s*(.+)$', line_stripped)
-                        if kv:
-                            author = kv.group(2).strip()
-                            continue
-
-                if not description:
-                    paragraphs = [p.strip() for p in doc.split('\n\n') if p.strip()]
-                    if paragraphs:
-                        description = paragraphs[0].splitlines()[0].strip()
-
-            metas[str(child.relative_to(repo_dir))] = {"path": str(child.relative_to(repo_dir)), "description": description, "topology": topology, "author": author, "explicit_fields": explicit_fields}
+            meta = metacache.get_meta(repo, rel, Path(entry.path), entry.stat())
+        except Exception:
+            metas[rel] = None
+            continue
+        metas[rel] = {"path": rel, **meta}
 
     return metas
 
 
+def _entry_in_repo(entry: os.DirEntry, repo_dir: Path) -> bool:
+    """False for a symlink whose target lies outside the repo (only symlinks need resolving)."""
+    return not entry.is_symlink() or registry.within(str(repo_dir), os.path.realpath(entry.path))
+
+
+def _walk_meta(repo: str, repo_dir: Path, directory: Path, parts: tuple, levels: Optional[int],
+               include: List[str], exclude: List[str], cursor: Optional[tuple]):
+    """Yield (rel, meta or exception) for files under `directory` in sorted depth-first order.
+
+    Paths compare as tuples of their parts, which is the order of the walk, so
+    everything up to and including `cursor` is skipped without descending into
+    directories that lie entirely before it.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        entry_parts = parts + (entry.name,)
+        rel = '/'.join(entry_parts)
+        if any(fnmatch.fnmatchcase(rel, pat) for pat in exclude):
+            continue
+        try:
+            # symlinked directories are not followed (loops, paths outside the repo)
+            if entry.is_dir(follow_symlinks=False):
+                if levels is not None and levels <= 1:
+                    continue
+                if cursor is not None and entry_parts < cursor and cursor[:len(entry_parts)] != entry_parts:
+                    continue
+                yield from _walk_meta(repo, repo_dir, Path(entry.path), entry_parts,
+                                      None if levels is None else levels - 1, include, exclude, cursor)
+                continue
+            if not entry.is_file() or not _entry_in_repo(entry, repo_dir):
+                continue
+        except OSError:
+            continue
+        if cursor is not None and entry_parts <= cursor:
+            continue
+        if include and not any(fnmatch.fnmatchcase(rel, pat) for pat in include):
+            continue
+        try:
+            yield rel, metacache.get_meta(repo, rel, Path(entry.path), entry.stat())
+        except Exception as e:
+            yield rel, e
+
+
+@router.get("/fs/meta-tree")
+@executors.offload("fs")
+def fs_get_meta_tree(
+    repo: str,
+    path: str = '.',
+    depth: Optional[int] = Query(None, ge=1),
+    include: List[str] = Query([]),
+    exclude: List[str] = Query([]),
+    cursor: Optional[str] = None,
+):
+    """Stream metadata for every file under `path` as NDJSON, one record per line.
+
+    Files are walked depth-first in sorted path order and each record is sent as soon
+    as it is parsed: {"path", "description", "topology", "author", "explicit_fields"},
+    or {"path", "error"} for unreadable files. `depth` limits the walk (1 = direct
+    children, like /fs/meta-dir). `include` / `exclude` are repeatable globs matched
+    against the repo-relative path (`exclude` also prunes directories). Pass the last
+    path received as `cursor` to resume after it. The stream ends with
+    {"done": true, "files": N}; a missing final record means it was interrupted.
+    """
+    repo_dir = _fs_repo_dir(repo)
+
+    target = _fs_target(repo_dir, path)
+
+    if not target.exists() or not target.is_dir():
+        raise HTTPException(status_code=404, detail="Path not found or not a directory")
+
+    cursor_parts = tuple(p for p in cursor.split('/') if p and p != '.') if cursor else None
+    # hidden directories above `target` hide everything below them
+    if _is_hidden(target, repo_dir):
+        records = iter(())
+    else:
+        records = _walk_meta(repo, repo_dir, target, target.relative_to(repo_dir).parts, depth, include, exclude,
+                             cursor_parts)
+
+    def generate():
+        count = 0
+        for rel, meta in records:
+            if isinstance(meta, Exception):
+                record = {"path": rel, "error": str(meta)}
+            else:
+                record = {"path": rel, **meta}
+            count += 1
+            yield json.dumps(record) + "\n"
+        yield json.dumps({"done": True, "files": count}) + "\n"
+
+    return StreamingResponse(executors.iterate("fs", generate()), media_type="application/x-ndjson")
+
+
+@router.get("/executors")
+async def executor_stats():
+    """Return worker, queue and saturation counters of the fs/git pools and the default threadpool.
+
+    `streams` counts the open streamed responses; each holds one slot of its pool's limit.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        **executors.stats(),
+        "default": {"workers": limiter.total_tokens, "running": limiter.borrowed_tokens},
+    }
+
+
+@router.get("/fs/meta-cache")
+def fs_meta_cache_stats():
+    """Return hit/miss/eviction counters and size of the in-process /fs/meta cache."""
+    return metacache.stats()
+
+
 @router.get('/brands')
 def list_brands(db: Session = Depends(get_db)):
     """Return list of brands (id_brand, brand_name)."""
@@ -1220,8 +1729,11 @@ def _resolve_suites_dir(repo: str, request: Request):
     WORKING_BASE_PATH/<username>/<SUITES_FOLDER>. Otherwise, fall back to
     the repository-local <repo>/suites directory (historic behavior).
     """
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
+    try:
+        repo_dir = Path(registry.repo_root(repo))
+    except registry.RepoNotFound:
+        # per-user suites do not need the repo to exist on disk
+        repo_dir = Path(os.path.realpath(os.path.join(settings.REPOS_BASE_PATH, repo)))
     username = _extract_username_from_request(request)
     if username:
         # per-user working dir
@@ -1239,6 +1751,7 @@ def _resolve_suites_dir(repo: str, request: Request):
 
 
 @router.post("/fs/save-suite")
+@executors.offload("fs")
 def fs_save_suite(payload: SuitePayload, request: Request):
     repo = payload.repo
     name = payload.name
@@ -1250,10 +1763,7 @@ def fs_save_suite(payload: SuitePayload, request: Request):
     - name: suite name (filename-safe)
     - files: array of relative file paths inside the repo
     """
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
-    if not repo_dir.exists() or not repo_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Repo not found on disk")
+    repo_dir = _fs_repo_dir(repo)
 
     # basic validation for suite name (avoid traversal)
     if not name or '/' in name or '\\' in name:
@@ -1262,10 +1772,9 @@ def fs_save_suite(payload: SuitePayload, request: Request):
     # ensure files are inside the repo and not hidden
     clean_files = []
     for f in files:
-        target = (repo_dir / f).resolve()
         try:
-            target.relative_to(repo_dir)
-        except Exception:
+            target = Path(registry.resolve(str(repo_dir), f))
+        except PermissionError:
             raise HTTPException(status_code=400, detail=f"File '{f}' is outside the repo")
         # do not allow hidden files
         if _is_hidden(target, repo_dir):
@@ -1333,6 +1842,7 @@ def fs_save_suite(payload: SuitePayload, request: Request):
 
 
 @router.get("/fs/list-suites")
+@executors.offload("fs")
 def fs_list_suites(repo: str, request: Request):
     """List suite manifests under repo/suites/*.json and return their content plus robot path if present."""
     suites_dir, repo_dir = _resolve_suites_dir(repo, request)
@@ -1370,15 +1880,16 @@ def fs_list_suites(repo: str, request: Request):
 
 
 @router.get("/fs/suite-file")
+@executors.offload("fs")
 def fs_get_suite_file(repo: str, name: str, request: Request):
     """Return the content of the generated .robot file for a suite name under repo/suites/<name>.robot"""
-    base = Path(settings.REPOS_BASE_PATH)
-    repo_dir = (base / repo).resolve()
-    if not repo_dir.exists() or not repo_dir.is_dir():
-        raise HTTPException(status_code=404, detail="Repo not found on disk")
+    repo_dir = _fs_repo_dir(repo)
 
     suites_dir, _repo_dir = _resolve_suites_dir(repo, request)
-    robot_path = suites_dir / f"{name}.robot"
+    try:
+        robot_path = Path(registry.resolve(os.path.realpath(suites_dir), f"{name}.robot"))
+    except PermissionError:
+        raise HTTPException(status_code=403, detail="Access denied")
 
     if not robot_path.exists() or not robot_path.is_file():
         raise HTTPException(status_code=404, detail="Robot file not found")
@@ -1394,3 +1905,80 @@ def fs_get_suite_file(repo: str, name: str, request: Request):
         robot_rel = str(robot_path)
 
     return {"path": robot_rel, "content": content}
+
+
+class ImpactPayload(BaseModel):
+    repo: str
+    paths: Optional[List[str]] = None
+    base: Optional[str] = None
+    head: Optional[str] = None
+
+
+@router.post("/impact")
+@executors.offload("git")
+def impacted_tests(payload: ImpactPayload, request: Request, db: Session = Depends(get_db)):
+    """Return the scripts and saved suites affected by a set of changed files.
+
+    Payload:
+    - repo: repository directory name
+    - paths: changed repo-relative paths, and/or
+    - base / head: a commit range (head defaults to HEAD); the files changed between
+      the two commits are added to `paths`
+
+    Scripts are found through the import graph built by the indexer: a changed script
+    is affected itself (depth 0), and so is every script importing an affected file,
+    directly (depth 1) or transitively. Suites are the saved suite manifests (see
+    /fs/list-suites) listing at least one affected script.
+    """
+    db_repo = db.query(Repo).filter(Repo.name == payload.repo).first()
+    if not db_repo:
+        raise HTTPException(status_code=404, detail="Repo not found")
+    if not payload.paths and not payload.base:
+        raise HTTPException(status_code=400, detail="Specify paths or a base commit")
+
+    changed = set()
+    for p in payload.paths or []:
+        rel = posixpath.normpath(p.replace('\\', '/')).strip('/')
+        if rel in ('.', '') or rel == '..' or rel.startswith('../'):
+            raise HTTPException(status_code=400, detail=f"Invalid path '{p}'")
+        changed.add(rel)
+    if payload.base:
+        git_repo = GitRepo(_fs_repo_dir(payload.repo))
+        try:
+            base = git_repo.commit(payload.base).hexsha
+            head = git_repo.commit(payload.head or 'HEAD').hexsha
+        except Exception:
+            raise HTTPException(status_code=400, detail="Commit non valido")
+        diff = changed_paths(git_repo, base, head)
+        if diff is None:
+            raise HTTPException(status_code=400, detail="Could not diff the commit range")
+        changed.update(diff[0])
+        changed.update(diff[1])
+
+    depths = depgraph.affected(db, db_repo.id, changed)
+    rel_paths = list(depths)
+    scripts = []
+    for i in range(0, len(rel_paths), 500):
+        rows = db.query(Script.id, Script.path, Script.rel_path).filter(
+            Script.repo_id == db_repo.id, Script.rel_path.in_(rel_paths[i:i + 500]))
+        scripts.extend({"id": r.id, "path": r.path, "rel_path": r.rel_path, "depth": depths[r.rel_path]} for r in rows)
+    scripts.sort(key=lambda s: (s["depth"], s["rel_path"]))
+
+    suites = []
+    suites_dir, repo_dir = _resolve_suites_dir(payload.repo, request)
+    if suites_dir.is_dir():
+        for f in sorted(suites_dir.glob('*.json')):
+            try:
+                manifest = json.loads(f.read_text(encoding='utf-8'))
+                files = [str(x).replace(os.sep, '/') for x in manifest.get('files') or []]
+            except Exception:
+                continue
+            hits = [x for x in files if x in depths]
+            if hits:
+                try:
+                    fpath = str(f.relative_to(repo_dir))
+                except Exception:
+                    fpath = str(f)
+                suites.append({"name": f.stem, "path": fpath, "files": hits})
+
+    return {"repo": payload.repo, "changed": sorted(changed), "scripts": scripts, "suites": suites}
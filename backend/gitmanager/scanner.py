@@ -0,0 +1,39 @@
+"""Parallel file parsing engine used by repo sync and the backfill script.
+
+Parsing (file read + ast.parse + regex passes) is CPU bound, so large scans are
+spread across a ProcessPoolExecutor. Results are yielded as soon as each chunk is
+parsed, letting callers start writing to the DB before the whole scan is done.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from backend.core.config import settings
+
+
+def scan_files(paths: List[Path], parse: Callable[[Path], dict], workers: Optional[int] = None,
+               chunksize: Optional[int] = None) -> Iterator[Tuple[Path, dict]]:
+    """Yield (path, parse(path)) for every path, in input order.
+
+    `parse` must be a picklable top-level function. `workers` and `chunksize` default
+    to `settings.SCAN_WORKERS` / `settings.SCAN_CHUNK_SIZE`; small inputs or a single
+    worker are parsed serially in the calling thread to avoid pool start-up cost.
+    """
+    paths = list(paths)
+    workers = settings.SCAN_WORKERS if workers is None else workers
+    chunksize = max(1, settings.SCAN_CHUNK_SIZE if chunksize is None else chunksize)
+
+    if workers <= 1 or len(paths) <= chunksize:
+        for p in paths:
+            yield p, parse(p)
+        return
+
+    # 'spawn' avoids forking a multi-threaded server process (uvicorn workers,
+    # DB pool threads) which can deadlock on locks held at fork time
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        # Executor.map submits every chunk up front and yields results in order
+        # as soon as the corresponding chunk completes
+        for p, parsed in zip(paths, pool.map(parse, paths, chunksize=chunksize)):
+            yield p, parsed
@@ -0,0 +1,214 @@
+"""Periodic fleet-wide fetch of every registered repo.
+
+Every `settings.FETCH_INTERVAL` seconds each repo in the `repos` table is checked
+with a cheap `git ls-remote` of its branch (at most `FETCH_CONCURRENCY` at a time).
+Repos whose remote head equals the last indexed commit, or that were synced less
+than an interval ago, are skipped; the others are fetched and re-indexed through the
+sync job queue (so a manual /git/sync of the same repo is never duplicated). Each
+repo check is recorded as a SyncRun row with its timings and outcome. At most one
+run (periodic or manual) is in progress at a time.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+from git import Git
+
+from backend.core.config import settings
+from backend.db.models import Repo, SyncRun
+from backend.db.session import SessionLocal
+from backend.gitmanager import jobs
+
+logger = logging.getLogger(__name__)
+
+
+def remote_head(local_path: str, url: str, branch: str) -> Optional[str]:
+    """Return the SHA of `branch` on the remote (ls-remote), or None if it does not exist."""
+    if local_path and Path(local_path).is_dir():
+        git, remote = Git(local_path), 'origin'
+    else:
+        git, remote = Git(), url
+    out = git.ls_remote(remote, f"refs/heads/{branch}", kill_after_timeout=settings.FETCH_TIMEOUT)
+    for line in out.splitlines():
+        sha, _, ref = line.partition('\t')
+        if ref == f"refs/heads/{branch}":
+            return sha
+    return None
+
+
+def _recently_synced(last_sync: Optional[datetime], now: datetime) -> bool:
+    if last_sync is None:
+        return False
+    if last_sync.tzinfo is None:
+        # stored as naive UTC (datetime.utcnow) on some backends
+        last_sync = last_sync.replace(tzinfo=timezone.utc)
+    return now - last_sync < timedelta(seconds=settings.FETCH_MIN_AGE)
+
+
+def check_repo(run_id: str, repo_id: int) -> dict:
+    """Check one repo, sync it if its remote head moved, and record a SyncRun row."""
+    db = SessionLocal()
+    try:
+        repo = db.query(Repo).filter(Repo.id == repo_id).first()
+        if not repo:
+            return {}
+        now = datetime.now(timezone.utc)
+        record = SyncRun(run_id=run_id, repo_id=repo.id, started_at=now)
+        branch = repo.branch or 'main'
+        start = time.monotonic()
+        try:
+            if _recently_synced(repo.last_sync, now):
+                record.outcome = 'skipped'
+                record.detail = 'synced less than FETCH_MIN_AGE seconds ago'
+            else:
+                sha = remote_head(repo.local_path, repo.url, branch)
+                record.check_ms = int((time.monotonic() - start) * 1000)
+                record.remote_commit = sha
+                if sha is None:
+                    record.outcome = 'error'
+                    record.detail = f"branch '{branch}' not found on remote"
+                elif sha == repo.last_indexed_commit and Path(repo.local_path).is_dir():
+                    record.outcome = 'unchanged'
+                else:
+                    sync_start = time.monotonic()
+                    try:
+                        job, _attached = jobs.submit_sync(repo.name, repo.url, branch, fetch=True)
+                    except jobs.SyncConflict as e:
+                        # e.g. a manual sync without fetch, which would not bring in the remote head;
+                        # the next run checks the repo again
+                        job = None
+                        record.outcome = 'skipped'
+                        record.detail = str(e)
+                    if job is not None:
+                        finished = job.wait(settings.FETCH_SYNC_TIMEOUT)
+                        record.sync_ms = int((time.monotonic() - sync_start) * 1000)
+                        if not finished:
+                            record.outcome = 'error'
+                            record.detail = f"sync job {job.id} still running after {settings.FETCH_SYNC_TIMEOUT}s"
+                        elif job.status == 'done':
+                            record.outcome = 'synced'
+                            record.detail = str(job.result)
+                        else:
+                            record.outcome = 'error'
+                            record.detail = '; '.join(job.errors)
+        except Exception as e:
+            record.check_ms = record.check_ms or int((time.monotonic() - start) * 1000)
+            record.outcome = 'error'
+            record.detail = str(e)
+        db.add(record)
+        db.commit()
+        return {'repo': repo.name, 'outcome': record.outcome, 'check_ms': record.check_ms, 'sync_ms': record.sync_ms}
+    finally:
+        db.close()
+
+
+# id of the run in progress, if any
+_run_lock = threading.Lock()
+_current_run: Optional[str] = None
+
+
+def _claim() -> Tuple[str, bool]:
+    """Reserve the run slot; returns (run_id, claimed), the id of the active run if not claimed."""
+    global _current_run
+    with _run_lock:
+        if _current_run is not None:
+            return _current_run, False
+        _current_run = uuid.uuid4().hex
+        return _current_run, True
+
+
+def _release(run_id: str):
+    global _current_run
+    with _run_lock:
+        if _current_run == run_id:
+            _current_run = None
+
+
+def current_run() -> Optional[str]:
+    with _run_lock:
+        return _current_run
+
+
+def _run(run_id: str):
+    db = SessionLocal()
+    try:
+        repo_ids = [r.id for r in db.query(Repo.id).all()]
+    finally:
+        db.close()
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, settings.FETCH_CONCURRENCY), thread_name_prefix='fleet-fetch') as pool:
+        results = list(pool.map(lambda rid: check_repo(run_id, rid), repo_ids))
+    outcomes = {}
+    for r in results:
+        if r:
+            outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+    logger.info('fleet fetch %s: %d repos in %.1fs %s', run_id, len(repo_ids), time.monotonic() - start, outcomes)
+
+
+def run_once() -> str:
+    """Check every registered repo once (bounded concurrency); returns the run id.
+
+    If a run is already in progress nothing is started and its id is returned.
+    """
+    run_id, claimed = _claim()
+    if not claimed:
+        logger.info('fleet fetch %s still in progress, run skipped', run_id)
+        return run_id
+    try:
+        _run(run_id)
+    finally:
+        _release(run_id)
+    return run_id
+
+
+def trigger() -> Tuple[str, bool]:
+    """Start a run in a background thread unless one is in progress; returns (run_id, started)."""
+    run_id, claimed = _claim()
+    if not claimed:
+        return run_id, False
+
+    def target():
+        try:
+            _run(run_id)
+        except Exception:
+            logger.exception('fleet fetch run failed')
+        finally:
+            _release(run_id)
+
+    threading.Thread(target=target, name='fleet-fetch-manual', daemon=True).start()
+    return run_id, True
+
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _loop():
+    while not _stop.wait(settings.FETCH_INTERVAL):
+        try:
+            run_once()
+        except Exception:
+            logger.exception('fleet fetch run failed')
+
+
+def start():
+    """Start the periodic fetch thread if FETCH_INTERVAL > 0."""
+    global _thread
+    if _thread is not None or settings.FETCH_INTERVAL <= 0:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name='fleet-fetch-scheduler', daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
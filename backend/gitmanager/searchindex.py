@@ -0,0 +1,281 @@
+"""Full-text search over indexed scripts, backed by a local SQLite FTS5 index.
+
+Each Script row is indexed (rowid = script id) with its filename, repo-relative path,
+description, topology, author, function names and docstrings from `functions_doc`
+and, with `SEARCH_INDEX_CONTENT`, the file content. The index is a derived copy of
+the `scripts` table: sync and the watcher call `refresh` with the paths they touched
+after committing, and a repo that was never indexed is indexed in full on its first
+refresh. `rebuild` recreates it from the database.
+"""
+import html
+import json
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from backend.core.config import settings
+from backend.db.models import Repo, Script
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# bm25 weights, in column order: filename, rel_path, description, topology, author, functions, content
+_WEIGHTS = (10.0, 5.0, 4.0, 2.0, 2.0, 2.0, 1.0)
+_COLUMNS = ("filename", "rel_path", "description", "topology", "author", "functions", "content")
+# rows read from / written to the database per statement
+_CHUNK = 500
+
+
+def _conn() -> Optional[sqlite3.Connection]:
+    if not settings.SEARCH_INDEX_ENABLED:
+        return None
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        path = Path(settings.SEARCH_INDEX_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS scripts_fts USING fts5("
+            + ", ".join(_COLUMNS) + ", prefix = '2 3')"
+        )
+        # fts5 cannot filter UNINDEXED columns through an index: keep the lookup keys aside
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS scripts_docs ("
+            " script_id INTEGER PRIMARY KEY, repo_id INTEGER NOT NULL, path TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_scripts_docs_repo_path ON scripts_docs (repo_id, path)")
+        conn.execute("CREATE TABLE IF NOT EXISTS indexed_repos (repo_id INTEGER PRIMARY KEY)")
+        _local.conn = conn
+    return conn
+
+
+def _functions_text(functions_doc: Optional[str]) -> str:
+    try:
+        functions = json.loads(functions_doc) if functions_doc else []
+    except ValueError:
+        return ""
+    parts = []
+    for fn in functions or []:
+        parts.append(fn.get("name") or "")
+        if fn.get("doc"):
+            parts.append(fn["doc"])
+    return "\n".join(parts)
+
+
+def _content_text(path: str) -> str:
+    if not settings.SEARCH_INDEX_CONTENT:
+        return ""
+    try:
+        with open(path, "rb") as f:
+            return f.read(settings.SEARCH_INDEX_CONTENT_MAX_BYTES).decode("utf-8", "ignore")
+    except OSError:
+        return ""
+
+
+def _rel_path(path: str, local_path: str) -> str:
+    try:
+        return Path(path).relative_to(local_path).as_posix()
+    except ValueError:
+        return path
+
+
+def _delete(conn, repo_id: int, paths: Optional[List[str]]):
+    if paths is None:
+        ids = [r[0] for r in conn.execute("SELECT script_id FROM scripts_docs WHERE repo_id = ?", (repo_id,))]
+    else:
+        ids = []
+        for i in range(0, len(paths), _CHUNK):
+            chunk = paths[i:i + _CHUNK]
+            ids.extend(r[0] for r in conn.execute(
+                "SELECT script_id FROM scripts_docs WHERE repo_id = ? AND path IN (%s)" % ",".join("?" * len(chunk)),
+                [repo_id, *chunk]))
+    for i in range(0, len(ids), _CHUNK):
+        chunk = ids[i:i + _CHUNK]
+        marks = ",".join("?" * len(chunk))
+        conn.execute("DELETE FROM scripts_fts WHERE rowid IN (%s)" % marks, chunk)
+        conn.execute("DELETE FROM scripts_docs WHERE script_id IN (%s)" % marks, chunk)
+
+
+def _insert(conn, db_repo: Repo, rows):
+    fts, docs = [], []
+    for row in rows:
+        fts.append((row.id, row.filename, _rel_path(row.path, db_repo.local_path), row.description or "",
+                    row.topology or "", row.author or "", _functions_text(row.functions_doc),
+                    _content_text(row.path)))
+        docs.append((row.id, db_repo.id, row.path))
+    conn.executemany(
+        "INSERT INTO scripts_fts (rowid, %s) VALUES (?, ?, ?, ?, ?, ?, ?, ?)" % ", ".join(_COLUMNS), fts)
+    conn.executemany("INSERT INTO scripts_docs (script_id, repo_id, path) VALUES (?, ?, ?)", docs)
+
+
+def refresh(db, db_repo: Repo, paths: Optional[Iterable[str]] = None):
+    """Re-index the given absolute script paths of a repo from the database.
+
+    Paths whose row is gone are dropped from the index. With `paths=None`, or when the
+    repo has never been indexed, the whole repo is re-indexed. Never raises: the
+    index is an optimisation and a failed refresh is only logged.
+    """
+    try:
+        conn = _conn()
+        if conn is None:
+            return
+        known = conn.execute("SELECT 1 FROM indexed_repos WHERE repo_id = ?", (db_repo.id,)).fetchone()
+        paths = None if paths is None or not known else sorted(set(paths))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            _delete(conn, db_repo.id, paths)
+            cols = (Script.id, Script.path, Script.filename, Script.description, Script.topology,
+                    Script.author, Script.functions_doc)
+            if paths is None:
+                query = db.query(*cols).filter(Script.repo_id == db_repo.id).yield_per(_CHUNK)
+                batch = []
+                for row in query:
+                    batch.append(row)
+                    if len(batch) >= _CHUNK:
+                        _insert(conn, db_repo, batch)
+                        batch = []
+                _insert(conn, db_repo, batch)
+            else:
+                for i in range(0, len(paths), _CHUNK):
+                    rows = db.query(*cols).filter(Script.repo_id == db_repo.id,
+                                                  Script.path.in_(paths[i:i + _CHUNK])).all()
+                    _insert(conn, db_repo, rows)
+            conn.execute("INSERT OR IGNORE INTO indexed_repos (repo_id) VALUES (?)", (db_repo.id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    except Exception as e:
+        logger.warning("search index refresh failed for repo %s: %s", db_repo.name, e)
+
+
+def rebuild(db):
+    """Drop the index and re-index every repo from the database."""
+    conn = _conn()
+    if conn is None:
+        return
+    conn.execute("DELETE FROM scripts_fts")
+    conn.execute("DELETE FROM scripts_docs")
+    conn.execute("DELETE FROM indexed_repos")
+    for db_repo in db.query(Repo).all():
+        refresh(db, db_repo)
+    conn.execute("INSERT INTO scripts_fts (scripts_fts) VALUES ('optimize')")
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in text.split() if t.replace('"', '')]
+
+
+def match_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    quoted = ['"%s"' % t.replace('"', '""') for t in _terms(text)]
+    if not quoted:
+        return ""
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight_re(text: str):
+    """Regex matching the query words the way the unicode61 tokenizer splits them."""
+    alternatives = []
+    terms = _terms(text)
+    for i, term in enumerate(terms):
+        tokens = [t for t in re.split(r'[\W_]+', term) if t]
+        if not tokens:
+            continue
+        body = r'[\W_]+'.join(re.escape(t) for t in tokens)
+        tail = r'[^\W_]*' if i == len(terms) - 1 else ''
+        alternatives.append(body + tail)
+    if not alternatives:
+        return None
+    return re.compile(r'(?<![^\W_])(?:%s)(?![^\W_])' % '|'.join(alternatives), re.IGNORECASE)
+
+
+def _mark(value: str, pattern) -> Optional[str]:
+    """HTML-escape `value` (indexed file text is untrusted) and wrap the matches in <mark>."""
+    if not value:
+        return None
+    if not pattern:
+        return html.escape(value)
+    out, pos = [], 0
+    for m in pattern.finditer(value):
+        out.append(html.escape(value[pos:m.start()]))
+        out.append('<mark>%s</mark>' % html.escape(m.group(0)))
+        pos = m.end()
+    out.append(html.escape(value[pos:]))
+    return ''.join(out)
+
+
+def _snippet(fields, pattern, words: int = 16) -> str:
+    """The first matching field (description, functions, content, ...) cut to ~`words` words."""
+    for value in fields:
+        m = pattern.search(value) if value and pattern else None
+        if not m:
+            continue
+        before = value[:m.start()].split()
+        after = value[m.start():].split()
+        start = max(0, len(before) - words // 4)
+        parts = before[start:] + after[:words - len(before[start:])]
+        text = ' '.join(parts)
+        prefix = '…' if start > 0 else ''
+        suffix = '…' if len(before) - start + len(after) > len(parts) else ''
+        return prefix + _mark(text, pattern) + suffix
+    return ''
+
+
+def search(text: str, repo_id: Optional[int] = None, limit: int = 20, offset: int = 0) -> List[dict]:
+    """Return ranked matches for free text with <mark>-highlighted fields and a best-field snippet."""
+    conn = _conn()
+    if conn is None:
+        return []
+    query = match_query(text)
+    if not query:
+        return []
+    weights = ", ".join(str(w) for w in _WEIGHTS)
+    ranked = "SELECT f.rowid, bm25(scripts_fts, %s) AS score FROM scripts_fts f" % weights
+    params = [query]
+    if repo_id is not None:
+        ranked += " JOIN scripts_docs d ON d.script_id = f.rowid WHERE scripts_fts MATCH ? AND d.repo_id = ?"
+        params.append(repo_id)
+    else:
+        ranked += " WHERE scripts_fts MATCH ?"
+    ranked += " ORDER BY score LIMIT ? OFFSET ?"
+    params += [limit, offset]
+    page = conn.execute(ranked, params).fetchall()
+    if not page:
+        return []
+
+    # highlight only the returned page: fts5 highlight()/snippet() in the ranked query
+    # would run for every match before sorting
+    ids = [rowid for rowid, _score in page]
+    rows = {row[0]: row for row in conn.execute(
+        "SELECT f.rowid, d.repo_id, d.path, %s FROM scripts_fts f JOIN scripts_docs d ON d.script_id = f.rowid"
+        " WHERE f.rowid IN (%s)" % (", ".join("f." + c for c in _COLUMNS), ",".join("?" * len(ids))), ids)}
+    pattern = _highlight_re(text)
+    results = []
+    for rowid, score in page:
+        row = rows.get(rowid)
+        if row is None:
+            continue
+        filename, rel_path, description, topology, author, functions, content = row[3:]
+        results.append({
+            "id": rowid,
+            "repo_id": row[1],
+            "path": row[2],
+            "score": -score,
+            "highlights": {
+                "filename": _mark(filename, pattern),
+                "rel_path": _mark(rel_path, pattern),
+                "description": _mark(description, pattern),
+                "topology": _mark(topology, pattern),
+                "author": _mark(author, pattern),
+            },
+            "snippet": _snippet((description, functions, content, topology, author, rel_path), pattern),
+        })
+    return results
@@ -1,97 +1,506 @@
 import ast
 import json
+import os
 from pathlib import Path
 import re
-from git import Repo as GitRepo
+from git import Repo as GitRepo, GitCommandError
 from sqlalchemy.orm import Session
-from backend.db.models import Repo, Script
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from backend.db.models import Repo, Script, ScriptFunction
 from datetime import datetime
 
 from pathlib import Path
 from backend.core.config import settings
+from backend.gitmanager.scanner import scan_files
+from backend.gitmanager import parsecache
+from backend.gitmanager import metadata
+from backend.gitmanager import searchindex
+from backend.gitmanager import registry
+from backend.gitmanager import catfile
+from backend.gitmanager import depgraph
+
+def clone_or_pull(db, name: str, url: str, branch: str = "main", full_rescan: bool = False, progress=None,
+                  fetch: bool = False, clone_options: dict = None):
+    """Clone or update a repo and (re)index its .py scripts into the DB.
+
+    When the repo row already records the last indexed commit, only the paths that
+    changed between that commit and the new HEAD are re-parsed, upserted or deleted.
+    Pass `full_rescan=True` to ignore the recorded commit and walk the whole tree.
+    The whole index update runs in a single transaction.
+    Returns (db_repo, counts, mode) where `counts` reports inserted, updated, deleted
+    and unchanged script rows and `mode` is 'full' or 'incremental'.
+    `progress`, if given, is called as progress(phase, done, total) while syncing.
+
+    `clone_options` may set 'depth', 'filter' and 'sparse_paths'; given keys are stored
+    on the Repo row, missing keys fall back to the stored values. They are applied
+    when cloning and, with `fetch=True`, when fetching updates into an existing clone.
+    """
+    if progress is None:
+        progress = lambda phase, done=None, total=None: None
 
-def clone_or_pull(db, name: str, url: str, branch: str = "main"):
     local_path = Path('%s/%s' % (settings.REPOS_BASE_PATH,name))
     local_path.parent.mkdir(parents=True, exist_ok=True)
 
-    if local_path.exists():
-        repo = GitRepo(local_path)
-        origin = repo.remotes.origin
-        #origin.fetch()
-        repo.git.checkout(branch)
-        #origin.pull()
-    else:
-        repo = GitRepo.clone_from(url, local_path, branch=branch)
-
-    # registra o aggiorna Repo nel DB
-    db_repo = db.query(Repo).filter(Repo.name == name).first()
-    if not db_repo:
-        db_repo = Repo(name=name, url=url, branch=branch, local_path=local_path)
-        db.add(db_repo)
-    db_repo.last_sync = datetime.utcnow()
-    db.commit()
+    try:
+        # registra o aggiorna Repo nel DB (same transaction as the script rows)
+        db_repo = db.query(Repo).filter(Repo.name == name).first()
+        if not db_repo:
+            db_repo = Repo(name=name, url=url, branch=branch, local_path=str(local_path))
+            db.add(db_repo)
+        elif db_repo.local_path != str(local_path):
+            # REPOS_BASE_PATH moved: rows are matched by rel_path and get the new paths
+            db_repo.local_path = str(local_path)
+        previous_sparse = db_repo.sparse_paths
+        _apply_clone_options(db_repo, clone_options or {})
+        db.flush()
+        if db_repo.sparse_paths != previous_sparse:
+            # files entered/left the working tree without a commit: diffing cannot see that
+            full_rescan = True
+
+        progress("checkout")
+        if local_path.exists():
+            repo = GitRepo(local_path)
+            _configure_sparse(repo, db_repo)
+            if fetch:
+                _fetch_branch(repo, db_repo, branch)
+                # move the local branch to the fetched tip; a plain merge would refuse
+                # the new graft root a shallow fetch produces
+                repo.git.checkout("-B", branch, "FETCH_HEAD")
+            else:
+                repo.git.checkout(branch)
+        else:
+            repo = GitRepo.clone_from(url, local_path, branch=branch, multi_options=_clone_args(db_repo))
+            registry.refresh()
+            _configure_sparse(repo, db_repo)
+        head_sha = repo.head.commit.hexsha
+        db_repo.last_sync = datetime.utcnow()
+
+        changes = None
+        if not full_rescan and db_repo.last_indexed_commit:
+            changes = changed_paths(repo, db_repo.last_indexed_commit, head_sha)
+
+        if changes is None:
+            # full scan: every .py file in the working tree; rows for files that
+            # are gone are pruned by _write_scripts
+            mode = "full"
+            to_parse = list(Path(local_path).rglob("*.py"))
+            to_delete = None
+        else:
+            mode = "incremental"
+            changed, deleted = changes
+            to_parse = []
+            to_delete = [str(Path(local_path) / rel) for rel in deleted if rel.endswith(".py")]
+            for rel in changed:
+                pyfile = Path(local_path) / rel
+                if not rel.endswith(".py"):
+                    continue
+                if pyfile.is_file():
+                    to_parse.append(pyfile)
+                else:
+                    to_delete.append(str(pyfile))
+
+        # parsed results stream back from the worker pool while rows are written
+        progress("scan", 0, len(to_parse))
+        parsed_items = _report_progress(scan_files(to_parse, parse_docstrings), progress, len(to_parse))
+        touched = set()
+        counts = _write_scripts(db, db_repo.id, str(local_path), parsed_items, to_delete, head_sha, touched)
+
+        progress("commit", len(to_parse), len(to_parse))
+        db_repo.last_indexed_commit = head_sha
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_repo)
+    searchindex.refresh(db, db_repo, touched)
+    return db_repo, counts, mode
+
+
+def reindex_paths(db, db_repo: Repo, rel_paths, full: bool = False) -> dict:
+    """Re-index working-tree paths of an already registered repo (no git operations).
 
-    # scansione script .py
-    scripts = []
-    for pyfile in Path(local_path).rglob("*.py"):
-        parsed = parse_docstrings(pyfile)
-        db_script = db.query(Script).filter(Script.repo_id == db_repo.id, Script.path == str(pyfile)).first()
-        if not db_script:
-            db_script = Script(repo_id=db_repo.id, path=str(pyfile), filename=pyfile.name)
-            db.add(db_script)
-        db_script.module_doc = parsed.get("module_doc")
-        db_script.description = parsed.get("description")
-        db_script.topology = parsed.get("topology")
-        db_script.author = parsed.get("author")
-        db_script.functions_doc = json.dumps(parsed.get("functions"))
+    Each repo-relative path may be a file or a directory and may no longer exist:
+    existing .py files (or .py files below existing directories) are re-parsed and
+    upserted, rows for paths that are gone (including whole removed directories) are
+    deleted. With `full=True` the whole working tree is rescanned instead.
+    Commits and returns the inserted/updated/deleted/unchanged counts.
+    """
+    local_path = Path(db_repo.local_path)
+    try:
+        head_sha = catfile.get_pool(local_path).info("HEAD")[0]
+    except Exception:
+        head_sha = None
+
+    try:
+        if full:
+            to_parse = list(local_path.rglob("*.py"))
+            to_delete = None
+        else:
+            to_parse, to_delete = [], []
+            for rel in sorted(set(rel_paths)):
+                target = local_path / rel
+                if target.is_dir():
+                    to_parse.extend(target.rglob("*.py"))
+                elif target.is_file():
+                    if rel.endswith(".py"):
+                        to_parse.append(target)
+                else:
+                    # gone: drop the file row or every row below a removed directory
+                    prefix = str(target)
+                    rows = db.query(Script.path).filter(
+                        Script.repo_id == db_repo.id,
+                        (Script.path == prefix) | Script.path.like(prefix + os.sep + "%"),
+                    )
+                    # LIKE treats '_' as a wildcard: re-check the prefix exactly
+                    to_delete.extend(r.path for r in rows if r.path == prefix or r.path.startswith(prefix + os.sep))
+        touched = set()
+        counts = _write_scripts(db, db_repo.id, str(local_path), scan_files(to_parse, parse_docstrings), to_delete, head_sha, touched)
         db.commit()
-        db.refresh(db_script)
-        scripts.append(db_script)
-    return db_repo, scripts
+    except Exception:
+        db.rollback()
+        raise
+    searchindex.refresh(db, db_repo, touched)
+    return counts
+
+
+def _apply_clone_options(db_repo: Repo, options: dict):
+    """Store the clone options given for this sync on the Repo row."""
+    if "depth" in options:
+        depth = options["depth"]
+        db_repo.clone_depth = depth if depth and depth > 0 else None
+    if "filter" in options:
+        db_repo.clone_filter = options["filter"] or None
+    if "sparse_paths" in options:
+        paths = [p.strip("/") for p in (options["sparse_paths"] or []) if p and p.strip("/")]
+        if any(p.startswith("-") for p in paths):
+            raise ValueError("sparse paths must not start with '-'")
+        db_repo.sparse_paths = json.dumps(paths) if paths else None
+
+
+def _sparse_paths(db_repo: Repo) -> list:
+    try:
+        return json.loads(db_repo.sparse_paths) if db_repo.sparse_paths else []
+    except ValueError:
+        return []
+
+
+def _clone_args(db_repo: Repo) -> list:
+    """Return extra `git clone` arguments for the repo's depth/filter/sparse options."""
+    args = []
+    if db_repo.clone_depth:
+        args.append(f"--depth={int(db_repo.clone_depth)}")
+    if db_repo.clone_filter:
+        args.append(f"--filter={db_repo.clone_filter}")
+    if _sparse_paths(db_repo):
+        # start from an empty sparse checkout; _configure_sparse sets the cone afterwards
+        args.append("--sparse")
+    return args
+
+
+def _fetch_branch(repo: GitRepo, db_repo: Repo, branch: str):
+    """Fetch `branch` from origin honouring the repo's depth and filter options."""
+    args = []
+    if db_repo.clone_depth:
+        args.append(f"--depth={int(db_repo.clone_depth)}")
+    if db_repo.clone_filter:
+        args.append(f"--filter={db_repo.clone_filter}")
+    # everything after --end-of-options is positional, even if it looks like an option
+    repo.git.fetch(*args, "--end-of-options", "origin", branch)
+
+
+def _configure_sparse(repo: GitRepo, db_repo: Repo):
+    """Make the working tree match the repo's sparse-checkout list (or a full checkout)."""
+    paths = _sparse_paths(db_repo)
+    if paths:
+        repo.git.sparse_checkout("set", "--end-of-options", *paths)
+    else:
+        try:
+            enabled = repo.git.config("--bool", "--get", "core.sparseCheckout") == "true"
+        except GitCommandError:
+            # key not set
+            enabled = False
+        if enabled:
+            repo.git.sparse_checkout("disable")
+
+
+def _report_progress(items, progress, total: int):
+    """Pass `items` through, reporting a 'scan' progress step for every item."""
+    for done, item in enumerate(items, start=1):
+        progress("scan", done, total)
+        yield item
+
+
+# Script columns compared to decide whether an existing row needs an UPDATE
+_SCRIPT_FIELDS = ("module_doc", "description", "topology", "author", "functions_doc", "imports_doc",
+                  "rel_path", "rel_dir")
+# columns overwritten when an inserted row conflicts with an existing one
+_UPSERT_COLUMNS = _SCRIPT_FIELDS + ("path", "filename", "last_commit")
+
+
+def script_rel_path(path: str, base: str) -> str:
+    """`path` relative to the repo root `base`, with '/' separators."""
+    return os.path.relpath(path, base).replace(os.sep, "/")
+
+
+def script_rel_dir(path: str, base: str) -> str:
+    """Directory of `path` relative to the repo root `base`, '.' for files at the root."""
+    return os.path.dirname(os.path.relpath(path, base)) or "."
+
+
+def _insert_scripts(db: Session, rows: list):
+    """INSERT script rows; a row whose (repo_id, rel_path) already exists is updated instead.
+
+    Relies on the unique index on scripts(repo_id, rel_path), so a file inserted
+    meanwhile by a concurrent sync of the same repo neither fails the batch nor
+    creates a duplicate. Dialects without an upsert fall back to a plain INSERT.
+    """
+    dialect = db.get_bind().dialect.name
+    table = Script.__table__
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in _UPSERT_COLUMNS})
+    elif dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table)
+        stmt = stmt.on_conflict_do_update(index_elements=["repo_id", "rel_path"],
+                                          set_={c: stmt.excluded[c] for c in _UPSERT_COLUMNS})
+    else:
+        db.bulk_insert_mappings(Script, rows)
+        return
+    db.execute(stmt, rows)
+
+
+def _replace_functions(db: Session, repo_id: int, functions_by_id: dict):
+    """Rewrite the script_functions rows of the given scripts ({script_id: parsed functions})."""
+    ids = list(functions_by_id)
+    db.query(ScriptFunction).filter(ScriptFunction.script_id.in_(ids)).delete(synchronize_session=False)
+    rows = [
+        {"script_id": script_id, "repo_id": repo_id, "name": f.get("name"), "lineno": f.get("lineno"),
+         "signature": f.get("signature"), "docstring": f.get("doc")}
+        for script_id, functions in functions_by_id.items() for f in functions or []
+    ]
+    if rows:
+        db.bulk_insert_mappings(ScriptFunction, rows)
+
+
+def _write_scripts(db: Session, repo_id: int, base: str, parsed_items, to_delete, head_sha: str, touched: set = None) -> dict:
+    """Upsert parsed scripts for one repo using batched executemany statements.
+
+    `base` is the repo root (for the stored `rel_path` / `rel_dir`). `parsed_items` yields
+    (Path, parse_docstrings result) pairs. Existing rows are preloaded once into a map
+    keyed by `rel_path`, the key of the unique index, so no per-file SELECT is needed and
+    a repo whose absolute location moved (e.g. a new REPOS_BASE_PATH) keeps its rows,
+    which get the new `path`; inserts (as upserts, see
+    `_insert_scripts`) and updates are flushed every `settings.SYNC_BATCH_SIZE` rows,
+    together with the script_functions rows of the inserted/updated scripts; import
+    dependencies are resolved at the end, once the repo layout is known. `to_delete`
+    is a list of absolute paths to remove, or None to prune every row not written from
+    `parsed_items` (full scan); deletions are decided by row id, so a row upserted in
+    this run is never removed. Nothing is committed here: the caller owns the transaction.
+    Returns counts of inserted, updated, deleted and unchanged rows; the paths of
+    inserted, updated and deleted rows are also added to `touched` when given, and with
+    `SEARCH_INDEX_CONTENT` those of unchanged rows too (a body-only edit leaves the row
+    as is but changes the indexed content).
+    """
+    batch_size = max(1, settings.SYNC_BATCH_SIZE)
+    cols = [Script.id, Script.path] + [getattr(Script, f) for f in _SCRIPT_FIELDS]
+    existing = {row.rel_path or script_rel_path(row.path, base): row
+                for row in db.query(*cols).filter(Script.repo_id == repo_id)}
+
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    # ids of the rows written (inserted, updated or confirmed unchanged) in this run
+    inserts, updates, written_ids = [], [], set()
+    # parsed functions of inserted rows (by rel_path, ids are known after the insert) and of updated rows (by id)
+    inserted_functions, functions_by_id = {}, {}
+    # scripts whose imports must be resolved, and scripts added or removed (they change the layout)
+    resolve_ids, layout_changes = set(), set()
+
+    def flush(force=False):
+        if inserts and (force or len(inserts) >= batch_size):
+            _insert_scripts(db, inserts)
+            ids = db.query(Script.id, Script.rel_path).filter(
+                Script.repo_id == repo_id, Script.rel_path.in_(list(inserted_functions)))
+            for row in ids:
+                functions_by_id[row.id] = inserted_functions[row.rel_path]
+                resolve_ids.add(row.id)
+                written_ids.add(row.id)
+            inserts.clear()
+            inserted_functions.clear()
+        if updates and (force or len(updates) >= batch_size):
+            db.bulk_update_mappings(Script, updates)
+            updates.clear()
+        if functions_by_id and (force or len(functions_by_id) >= batch_size):
+            _replace_functions(db, repo_id, functions_by_id)
+            functions_by_id.clear()
+
+    for pyfile, parsed in parsed_items:
+        path = str(pyfile)
+        rel_path = script_rel_path(path, base)
+        values = {
+            "module_doc": parsed.get("module_doc"),
+            "description": parsed.get("description"),
+            "topology": parsed.get("topology"),
+            "author": parsed.get("author"),
+            "functions_doc": json.dumps(parsed.get("functions")),
+            "imports_doc": json.dumps(parsed.get("imports") or []),
+            "rel_path": rel_path,
+            "rel_dir": script_rel_dir(path, base),
+        }
+        row = existing.get(rel_path)
+        if row is None:
+            inserts.append(dict(values, repo_id=repo_id, path=path, filename=pyfile.name, last_commit=head_sha))
+            inserted_functions[rel_path] = parsed.get("functions")
+            layout_changes.add(rel_path)
+            counts["inserted"] += 1
+            if touched is not None:
+                touched.add(path)
+        elif row.path != path or any(getattr(row, f) != values[f] for f in _SCRIPT_FIELDS):
+            updates.append(dict(values, id=row.id, path=path, last_commit=head_sha))
+            written_ids.add(row.id)
+            if row.functions_doc != values["functions_doc"]:
+                functions_by_id[row.id] = parsed.get("functions")
+            if row.imports_doc != values["imports_doc"] or row.rel_path != values["rel_path"]:
+                resolve_ids.add(row.id)
+            counts["updated"] += 1
+            if touched is not None:
+                # the search index is keyed by absolute path: drop the entry under the old one
+                touched.update((path, row.path))
+        else:
+            counts["unchanged"] += 1
+            written_ids.add(row.id)
+            if touched is not None and settings.SEARCH_INDEX_CONTENT:
+                touched.add(path)
+        flush()
+    flush(force=True)
+
+    # a row written in this run is never deleted, whatever path it was listed under
+    if to_delete is None:
+        candidates = list(existing)
+    else:
+        candidates = {script_rel_path(p, base) for p in to_delete}
+    delete_rels = [rel for rel in candidates if rel in existing and existing[rel].id not in written_ids]
+    delete_ids = [existing[rel].id for rel in delete_rels]
+    for i in range(0, len(delete_ids), batch_size):
+        chunk = delete_ids[i:i + batch_size]
+        db.query(ScriptFunction).filter(ScriptFunction.script_id.in_(chunk)).delete(synchronize_session=False)
+        depgraph.delete(db, chunk)
+        db.query(Script).filter(Script.id.in_(chunk)).delete(synchronize_session=False)
+    counts["deleted"] = len(delete_ids)
+    layout_changes.update(delete_rels)
+    if touched is not None:
+        touched.update(existing[rel].path for rel in delete_rels)
+    depgraph.update(db, repo_id, resolve_ids, layout_changes)
+    return counts
+
+
+def changed_paths(repo: GitRepo, old_sha: str, new_sha: str):
+    """Return (changed, deleted) repo-relative paths between two commits.
+
+    Renames are reported as a delete of the old path plus a change of the new one.
+    Returns None when the diff cannot be computed (e.g. the old commit is no longer
+    reachable after a force-push), so the caller can fall back to a full rescan.
+    """
+    if old_sha == new_sha:
+        return [], []
+    try:
+        out = repo.git.diff("--name-status", "-M", "-z", old_sha, new_sha)
+    except GitCommandError:
+        return None
+
+    changed, deleted = [], []
+    fields = out.split("\0")
+    i = 0
+    while i < len(fields):
+        status = fields[i]
+        if not status:
+            i += 1
+            continue
+        kind = status[0]
+        if kind in ("R", "C"):
+            old_path, new_path = fields[i + 1], fields[i + 2]
+            if kind == "R":
+                deleted.append(old_path)
+            changed.append(new_path)
+            i += 3
+        else:
+            path = fields[i + 1]
+            if kind == "D":
+                deleted.append(path)
+            else:
+                changed.append(path)
+            i += 2
+    return changed, deleted
+
+# bump when parse_source output changes so cached results are invalidated
+PARSER_VERSION = 4
+
 
 def parse_docstrings(file_path: Path) -> dict:
+    """Parse a script's docstrings, reusing the content-addressed parse cache.
+
+    The file is read once; its git blob SHA is looked up in the cache before parsing.
+    """
+    try:
+        data = file_path.read_bytes()
+        sha = parsecache.blob_sha(data)
+        cached = parsecache.get("docstrings", sha, PARSER_VERSION)
+        if cached is not None:
+            return cached
+        parsed = parse_source(parsecache.decode_text(data), metadata.header_text(data))
+    except Exception:
+        return {"module_doc": None, "description": None, "topology": None, "author": None, "functions": [], "imports": []}
+    parsecache.put("docstrings", sha, PARSER_VERSION, parsed)
+    return parsed
+
+
+def _signature(node: ast.FunctionDef) -> str:
+    signature = f"{node.name}({ast.unparse(node.args)})"
+    if node.returns is not None:
+        signature += f" -> {ast.unparse(node.returns)}"
+    return signature
+
+
+def _imports(mod: ast.Module) -> list:
+    """Import statements anywhere in the module (also inside functions or try blocks), as written."""
+    imports = []
+    for node in ast.walk(mod):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append({"module": alias.name, "names": [], "level": 0, "lineno": node.lineno})
+        elif isinstance(node, ast.ImportFrom):
+            imports.append({"module": node.module or "", "names": [a.name for a in node.names],
+                            "level": node.level, "lineno": node.lineno})
+    imports.sort(key=lambda i: i["lineno"])
+    return imports
+
+
+def parse_source(src: str, header: str = None) -> dict:
+    """Extract module docstring, description/topology/author fields and function docs from source.
+
+    The fields come from `metadata.extract_meta` on the file header, so they match
+    what /fs/meta and /fs/meta-dir return; `header` defaults to the start of `src`.
+    """
+    if header is None:
+        header = metadata.header_text(src.encode("utf-8"))
+    meta = metadata.extract_meta(header)
+    fields = {"description": meta["description"], "topology": meta["topology"], "author": meta["author"]}
     try:
-        src = file_path.read_text(encoding="utf-8")
         mod = ast.parse(src)
         module_doc = ast.get_docstring(mod) or ""
 
-        # attempt to extract fields from module_doc. Support patterns like:
-        # :field Description: some text
-        # Description: some text
-        # :field Topology: X
-        # Author: Name
-        def extract_field(doc: str, names):
-            if not doc:
-                return None
-            for name in names:
-                # pattern with :field Name: value
-                m = re.search(rf"[:]?field\s+{re.escape(name)}\s*:\s*(.+)", doc, flags=re.IGNORECASE)
-                if m:
-                    return m.group(1).strip()
-                # pattern with Name: value
-                m = re.search(rf"^{re.escape(name)}\s*:\s*(.+)$", doc, flags=re.IGNORECASE | re.MULTILINE)
-                if m:
-                    return m.group(1).strip()
-            return None
-
-        description = extract_field(module_doc, ["Description", "description", "Desc"])
-        topology = extract_field(module_doc, ["Topology", "topology"])
-        author = extract_field(module_doc, ["Author", "author"])
-
         functions = []
         for node in mod.body:
             if isinstance(node, ast.FunctionDef):
                 functions.append({
                     "name": node.name,
-                    "doc": ast.get_docstring(node)
+                    "doc": ast.get_docstring(node),
+                    "lineno": node.lineno,
+                    "signature": _signature(node),
                 })
         return {
             "module_doc": module_doc,
-            "description": description,
-            "topology": topology,
-            "author": author,
-            "functions": functions
+            **fields,
+            "functions": functions,
+            "imports": _imports(mod),
         }
     except Exception as e:
-        return {"module_doc": None, "description": None, "topology": None, "author": None, "functions": []}
+        return {"module_doc": None, **fields, "functions": [], "imports": []}
@@ -0,0 +1,168 @@
+"""Generation-numbered snapshots of a repo's visible working tree, with deltas.
+
+Each walk of a repo is compared to the previous one; when anything was added,
+removed or changed (size/mtime) the repo's generation is bumped and the changed
+paths are logged. A client that already holds generation N asks for the changes
+since N and receives only those entries. The last `TREE_HISTORY` generations are
+kept; older `since` values, or a different `epoch` (the state lives in this
+process and restarts with it), get a full snapshot instead.
+
+Entries use a compact array encoding: a response carries a `dirs` table and each
+entry is [dir_index, name, is_dir, size, mtime_ms] (removed entries: [dir_index, name]).
+Hidden names and SUITES_FOLDER directories are left out, as in /fs/list; symlinked
+directories are listed but not descended into.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, Optional
+
+from backend.core.config import settings
+
+# process-wide: generations of different processes are not comparable
+EPOCH = uuid.uuid4().hex[:12]
+
+
+class _RepoTree:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.entries: Dict[str, tuple] = {}
+        self.walked_at = 0.0
+        # (generation, {path: 'added' | 'removed' | 'changed'}) for the retained generations
+        self.log = deque()
+
+
+_trees: Dict[str, _RepoTree] = {}
+_trees_lock = threading.Lock()
+
+
+def _walk(root: str) -> Dict[str, tuple]:
+    """Return {rel_path: (is_dir, size, mtime_ms)} for the visible tree under `root`."""
+    entries = {}
+    stack = [(root, '')]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            it = os.scandir(directory)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir and entry.name == settings.SUITES_FOLDER:
+                    continue
+                try:
+                    st = entry.stat()
+                    size, mtime = st.st_size, st.st_mtime_ns // 1000000
+                except OSError:
+                    # dangling symlink: listed like /fs/list does, without size/mtime
+                    size, mtime = 0, 0
+                rel = prefix + entry.name
+                if is_dir:
+                    entries[rel] = (1, 0, mtime)
+                    if not entry.is_symlink():
+                        stack.append((entry.path, rel + '/'))
+                else:
+                    entries[rel] = (0, size, mtime)
+    return entries
+
+
+def _diff(old: Dict[str, tuple], new: Dict[str, tuple]) -> Dict[str, str]:
+    changes = {}
+    for path, value in new.items():
+        before = old.get(path)
+        if before is None:
+            changes[path] = 'added'
+        elif before != value and not (before[0] and value[0]):
+            # a directory's own mtime only reflects its entries, which are diffed themselves
+            changes[path] = 'changed'
+    for path in old.keys() - new.keys():
+        changes[path] = 'removed'
+    return changes
+
+
+def _encode(paths, entries: Optional[Dict[str, tuple]]):
+    """Encode paths as (dirs, rows); with `entries` rows carry their values, else only dir/name."""
+    dirs = {}
+    rows = []
+    for path in sorted(paths):
+        parent, _, name = path.rpartition('/')
+        index = dirs.setdefault(parent, len(dirs))
+        rows.append([index, name, *entries[path]] if entries is not None else [index, name])
+    return list(dirs), rows
+
+
+def _refresh(tree: _RepoTree, root: str):
+    now = time.monotonic()
+    if tree.generation and now - tree.walked_at < settings.TREE_SNAPSHOT_TTL:
+        return
+    entries = _walk(root)
+    changes = _diff(tree.entries, entries) if tree.generation else None
+    tree.walked_at = now
+    if tree.generation and not changes:
+        return
+    tree.generation += 1
+    tree.entries = entries
+    if changes is not None:
+        tree.log.append((tree.generation, changes))
+    while len(tree.log) > settings.TREE_HISTORY:
+        tree.log.popleft()
+
+
+def snapshot(repo: str, root: str, since: Optional[int] = None, epoch: Optional[str] = None) -> dict:
+    """Return the repo tree at the current generation, or only the changes after `since`."""
+    with _trees_lock:
+        tree = _trees.setdefault(repo, _RepoTree())
+    with tree.lock:
+        _refresh(tree, root)
+        result = {"repo": repo, "epoch": EPOCH, "generation": tree.generation}
+        oldest = tree.log[0][0] - 1 if tree.log else tree.generation
+        if since is None or (epoch and epoch != EPOCH) or since > tree.generation or since < oldest:
+            dirs, rows = _encode(tree.entries, tree.entries)
+            result.update({"full": True, "dirs": dirs, "entries": rows})
+            return result
+
+        # the first change after `since` tells whether the path existed at `since`
+        first = {}
+        for generation, changes in tree.log:
+            if generation <= since:
+                continue
+            for path, kind in changes.items():
+                first.setdefault(path, kind)
+        added, changed, removed = [], [], []
+        for path, kind in first.items():
+            existed = kind != 'added'
+            exists = path in tree.entries
+            if exists and existed:
+                changed.append(path)
+            elif exists:
+                added.append(path)
+            elif existed:
+                removed.append(path)
+        dirs, added_rows = _encode(added, tree.entries)
+        changed_dirs, changed_rows = _encode(changed, tree.entries)
+        removed_dirs, removed_rows = _encode(removed, None)
+        # one dirs table for the three lists
+        table = {d: i for i, d in enumerate(dirs)}
+        for rows, local in ((changed_rows, changed_dirs), (removed_rows, removed_dirs)):
+            for row in rows:
+                row[0] = table.setdefault(local[row[0]], len(table))
+        result.update({"full": False, "since": since, "dirs": list(table),
+                       "added": added_rows, "changed": changed_rows, "removed": removed_rows})
+        return result
+
+
+def invalidate(repo: str, rel_paths=None):
+    """Force the next snapshot of `repo` to walk the tree again (watcher hook signature)."""
+    with _trees_lock:
+        tree = _trees.get(repo)
+    if tree is not None:
+        tree.walked_at = 0.0
@@ -0,0 +1,283 @@
+"""Optional inotify watcher keeping the `scripts` index in sync with REPOS_BASE_PATH.
+
+Files under REPOS_BASE_PATH also change outside the API (manual pulls, CI checkouts).
+When `settings.WATCH_REPOS` is enabled (Linux only) a background thread watches
+every directory of the repos registered in the DB. Events are coalesced per repo
+into a set of touched paths and flushed once the repo has been quiet for
+`WATCH_DEBOUNCE` seconds (or at most every `WATCH_MAX_DELAY` seconds during a long
+burst), so a branch switch touching thousands of files becomes one batched
+transaction. Bursts larger than `WATCH_FULL_RESCAN_THRESHOLD` paths, or an inotify
+queue overflow, fall back to a rescan of the whole working tree.
+
+Other in-process caches can register a callback with `add_invalidation_hook` to be
+told which repo-relative paths changed. Each server process runs its own watcher,
+so enable it on a single worker only.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from backend.core.config import settings
+from backend.db.models import Repo
+from backend.db.session import SessionLocal
+from backend.gitmanager.service import reindex_paths
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+# how often (seconds) the DB is checked for newly registered repos to watch
+_REFRESH_INTERVAL = 30.0
+
+_invalidation_hooks: List[Callable[[str, List[str]], None]] = []
+
+
+def add_invalidation_hook(hook: Callable[[str, List[str]], None]):
+    """Register hook(repo_name, rel_paths) to be called after changed paths are indexed."""
+    _invalidation_hooks.append(hook)
+
+
+class _Inotify:
+    """Minimal ctypes binding over the Linux inotify syscalls."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self, timeout: float):
+        """Yield (wd, mask, name) for pending events, waiting up to `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            buf = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return
+        i = 0
+        while i + _EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, i)
+            i += _EVENT_HEADER.size
+            name = buf[i:i + length].rstrip(b'\0')
+            i += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Pending:
+    __slots__ = ('paths', 'full', 'first', 'last')
+
+    def __init__(self, now: float):
+        self.paths = set()
+        self.full = False
+        self.first = now
+        self.last = now
+
+
+class RepoWatcher:
+    def __init__(self):
+        self._ino: Optional[_Inotify] = None
+        self._base_wd = None
+        self._dirs: Dict[int, tuple] = {}  # wd -> (repo name, absolute dir)
+        self._repos: Dict[str, str] = {}  # repo name -> local_path of repos registered in the DB
+        self._pending: Dict[str, _Pending] = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if not sys.platform.startswith('linux'):
+            logger.warning('repo watcher requires Linux inotify; not started')
+            return
+        self._ino = _Inotify()
+        self._base_wd = self._ino.add_watch(settings.REPOS_BASE_PATH, IN_CREATE | IN_MOVED_TO | IN_ONLYDIR)
+        self._refresh_repos()
+        for target, name in ((self._read_loop, 'repo-watch-read'), (self._flush_loop, 'repo-watch-flush')):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+        logger.info('repo watcher started on %s (%d directories)', settings.REPOS_BASE_PATH, len(self._dirs))
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
+        if self._ino:
+            self._ino.close()
+            self._ino = None
+
+    def _refresh_repos(self):
+        """Start watching repos registered in the DB that are not watched yet."""
+        db = SessionLocal()
+        try:
+            rows = db.query(Repo.name, Repo.local_path).all()
+        finally:
+            db.close()
+        for name, local_path in rows:
+            if name not in self._repos and local_path and os.path.isdir(local_path):
+                self._repos[name] = local_path
+                self._watch_tree(name, local_path)
+
+    def _watch_tree(self, repo_name: str, root: str):
+        for dirpath, dirnames, _files in os.walk(root):
+            # never watch .git or other hidden directories: they are not indexed
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            try:
+                wd = self._ino.add_watch(dirpath, _WATCH_MASK)
+            except OSError as e:
+                logger.warning('cannot watch %s: %s', dirpath, e)
+                continue
+            self._dirs[wd] = (repo_name, dirpath)
+
+    def _mark(self, repo_name: str, rel: Optional[str] = None, full: bool = False):
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(repo_name)
+            if entry is None:
+                entry = self._pending[repo_name] = _Pending(now)
+            entry.last = now
+            if full or len(entry.paths) >= settings.WATCH_FULL_RESCAN_THRESHOLD:
+                entry.full = True
+                entry.paths.clear()
+            elif rel is not None and not entry.full:
+                entry.paths.add(rel)
+            self._cond.notify()
+
+    def _read_loop(self):
+        last_refresh = time.monotonic()
+        while not self._stop.is_set():
+            if time.monotonic() - last_refresh >= _REFRESH_INTERVAL:
+                # repos synced after start-up: their row is committed after the clone
+                # created the directory, so the base directory event alone is not enough
+                last_refresh = time.monotonic()
+                try:
+                    self._refresh_repos()
+                except Exception:
+                    logger.exception('watcher could not refresh the repo list')
+            try:
+                events = list(self._ino.read(0.5))
+            except Exception:
+                logger.exception('inotify read failed')
+                time.sleep(1)
+                continue
+            for wd, mask, name in events:
+                self._handle(wd, mask, name)
+
+    def _handle(self, wd: int, mask: int, name: str):
+        if mask & IN_Q_OVERFLOW:
+            # events were dropped: only a full rescan can be trusted
+            logger.warning('inotify queue overflow: rescanning all watched repos')
+            for repo_name in list(self._repos):
+                self._mark(repo_name, full=True)
+            return
+        if wd == self._base_wd:
+            # a new directory appeared under REPOS_BASE_PATH: maybe a newly registered repo
+            self._refresh_repos()
+            return
+        if mask & IN_IGNORED:
+            self._dirs.pop(wd, None)
+            return
+        watched = self._dirs.get(wd)
+        if watched is None or not name or name.startswith('.'):
+            return
+        repo_name, dirpath = watched
+        abs_path = os.path.join(dirpath, name)
+        rel = os.path.relpath(abs_path, self._repos[repo_name])
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+            # watch the new subtree; files created before the watch existed are
+            # picked up because reindex_paths walks the whole directory
+            self._watch_tree(repo_name, abs_path)
+        self._mark(repo_name, rel)
+
+    def _flush_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                due = self._due(time.monotonic())
+                if not due:
+                    self._cond.wait(timeout=settings.WATCH_DEBOUNCE)
+                    continue
+                batch = [(name, self._pending.pop(name)) for name in due]
+            for repo_name, entry in batch:
+                self._apply(repo_name, entry)
+
+    def _due(self, now: float) -> List[str]:
+        # caller holds _cond
+        return [name for name, e in self._pending.items()
+                if now - e.last >= settings.WATCH_DEBOUNCE or now - e.first >= settings.WATCH_MAX_DELAY]
+
+    def _apply(self, repo_name: str, entry: _Pending):
+        start = time.monotonic()
+        db = SessionLocal()
+        try:
+            db_repo = db.query(Repo).filter(Repo.name == repo_name).first()
+            if not db_repo:
+                return
+            counts = reindex_paths(db, db_repo, entry.paths, full=entry.full)
+            logger.info('watcher re-indexed %s (%s): %s in %.2fs', repo_name,
+                        'full' if entry.full else f'{len(entry.paths)} paths', counts, time.monotonic() - start)
+        except Exception:
+            logger.exception('watcher failed to re-index %s', repo_name)
+            return
+        finally:
+            db.close()
+        for hook in _invalidation_hooks:
+            try:
+                hook(repo_name, None if entry.full else sorted(entry.paths))
+            except Exception:
+                logger.exception('watcher invalidation hook failed')
+
+
+_watcher: Optional[RepoWatcher] = None
+
+
+def start():
+    """Start the process-wide watcher (no-op if already running)."""
+    global _watcher
+    if _watcher is None:
+        _watcher = RepoWatcher()
+        _watcher.start()
+
+
+def stop():
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
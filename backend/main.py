@@ -2,6 +2,13 @@ from fastapi import FastAPI
 from backend.auth.routes import router as auth_router
 from backend.gitmanager.routes import router as git_router
 from fastapi.middleware.cors import CORSMiddleware
+from backend.gitmanager import catfile
+from backend.gitmanager import executors
+from backend.gitmanager import watcher
+from backend.gitmanager import metacache
+from backend.gitmanager import scheduler
+from backend.gitmanager import treesnap
+from backend.core.config import settings
 
 app = FastAPI(title="K@TE - Backend")
 
@@ -11,6 +18,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Content-Range"],
 )
 
 
@@ -19,6 +27,21 @@ app.include_router(git_router, prefix="/git", tags=["git"])
 # expose selected gitmanager routes also under /db for direct DB-related APIs
 app.include_router(git_router, prefix="/db", tags=["db"])
 
+@app.on_event("startup")
+def start_background_workers():
+    if settings.WATCH_REPOS:
+        watcher.add_invalidation_hook(metacache.invalidate)
+        watcher.add_invalidation_hook(treesnap.invalidate)
+        watcher.start()
+    scheduler.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    scheduler.stop()
+    watcher.stop()
+    catfile.close_all()
+    executors.shutdown()
+
 @app.get("/")
 def root():
     return {"msg": "K@TE backend pronto 🚀"}
@@ -0,0 +1,84 @@
+"""Regression tests for the script index written by sync (backend/gitmanager/service.py)."""
+import subprocess
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.core.config import settings
+from backend.db.models import Base, Repo, Script, ScriptFunction
+from backend.gitmanager import service
+
+SCRIPT = '''"""Demo test.
+
+Description: checks the helper
+"""
+
+
+def test_helper():
+    """Calls the helper."""
+    return 1
+'''
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    src = tmp_path / "origin"
+    (src / "tests").mkdir(parents=True)
+    (src / "tests" / "t1.py").write_text(SCRIPT)
+    _git(src, "init", "-q", "-b", "main")
+    _git(src, "add", ".")
+    _git(src, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", "init")
+    return src
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_WORKERS", 1)
+    monkeypatch.setattr(settings, "PARSE_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "SEARCH_INDEX_ENABLED", False)
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite3'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_full_rescan_after_base_path_move_keeps_rows(tmp_path, monkeypatch, origin, db):
+    old_base, new_base = tmp_path / "repos_old", tmp_path / "repos_new"
+    monkeypatch.setattr(settings, "REPOS_BASE_PATH", str(old_base))
+    _repo, counts, _mode = service.clone_or_pull(db, "demo", str(origin), "main")
+    assert counts["inserted"] == 1
+    script_id = db.query(Script.id).scalar()
+
+    old_base.rename(new_base)
+    monkeypatch.setattr(settings, "REPOS_BASE_PATH", str(new_base))
+    db_repo, counts, _mode = service.clone_or_pull(db, "demo", str(origin), "main", full_rescan=True)
+
+    assert counts == {"inserted": 0, "updated": 1, "deleted": 0, "unchanged": 0}
+    assert db_repo.local_path == str(new_base / "demo")
+    rows = db.query(Script.id, Script.path, Script.rel_path).all()
+    assert rows == [(script_id, str(new_base / "demo" / "tests" / "t1.py"), "tests/t1.py")]
+    assert [n for (n,) in db.query(ScriptFunction.name).filter(ScriptFunction.script_id == script_id)] == ["test_helper"]
+    assert db.query(Repo).count() == 1
+
+
+def test_full_rescan_prunes_removed_files(tmp_path, monkeypatch, origin, db):
+    (origin / "tests" / "t2.py").write_text(SCRIPT)
+    _git(origin, "add", ".")
+    _git(origin, "-c", "user.name=t", "-c", "user.email=t@example.com", "commit", "-q", "-m", "t2")
+    monkeypatch.setattr(settings, "REPOS_BASE_PATH", str(tmp_path / "repos"))
+    service.clone_or_pull(db, "demo", str(origin), "main")
+    kept_id = db.query(Script.id).filter(Script.rel_path == "tests/t1.py").scalar()
+
+    (tmp_path / "repos" / "demo" / "tests" / "t2.py").unlink()
+    _repo, counts, _mode = service.clone_or_pull(db, "demo", str(origin), "main", full_rescan=True)
+
+    assert counts == {"inserted": 0, "updated": 0, "deleted": 1, "unchanged": 1}
+    assert [i for (i,) in db.query(Script.id)] == [kept_id]
+    assert db.query(ScriptFunction).filter(ScriptFunction.script_id != kept_id).count() == 0
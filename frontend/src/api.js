@@ -14,13 +14,18 @@ export async function getDirs(repoId) {
 }
 
 export async function getScripts(repoId = null, dir = null) {
-  let url = `${API_BASE_URL}/git/scripts`;
-  const params = [];
-  if (repoId) params.push(`repo_id=${repoId}`);
-  if (dir) params.push(`dir=${encodeURIComponent(dir)}`);
-  if (params.length) url += `?${params.join("&")}`;
-  const response = await axios.get(url);
-  return response.data;
+  const params = {};
+  if (repoId) params.repo_id = repoId;
+  if (dir) params.dir = dir;
+  // the list is paginated: follow X-Next-Cursor until the last page
+  let scripts = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(`${API_BASE_URL}/git/scripts`, { params: cursor ? { ...params, cursor } : params });
+    scripts = scripts.concat(response.data);
+    cursor = response.headers['x-next-cursor'] || null;
+  } while (cursor);
+  return scripts;
 }
 
 export async function getScriptContent(scriptId) {